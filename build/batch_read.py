@@ -0,0 +1,145 @@
+import os
+import sys
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+import read_pdf
+import ledger
+import summary_snapshot
+
+
+REVIEW_QUEUE = "data/review_queue.csv"
+REVIEW_COLUMNS = ["pdf", "num_word_name", "reason"]
+
+
+def init_worker():
+    # workers must never block on input(), anything that would prompt the user
+    # raises read_pdf.ReviewNeeded instead
+    read_pdf.defer_prompts = True
+
+def parse_deferred(pdf_name, num_word_name):
+    try:
+        period, cash_in, cash_out, equities = read_pdf.parse_statement(pdf_name,
+                                                                       num_word_name)
+    except read_pdf.ReviewNeeded as query:
+        return {"pdf": pdf_name, "status": "review", "reason": str(query)}
+    except SystemExit:
+        # error_system_exit was hit
+        return {"pdf": pdf_name, "status": "review", "reason": "Parser error"}
+    except Exception as e:
+        # an unreadable PDF or a statement the parser trips on must not stop
+        # the rest of the batch
+        return {"pdf": pdf_name, "status": "review",
+                "reason": "{}: {}".format(type(e).__name__, e)}
+
+    # check_info_equities would prompt for any ticker missing from info.csv
+    info_df = ledger.open_ledger("info").read()
+    missing = [t for t in equities.ticker if t not in info_df.ticker.values]
+    if len(missing) != 0:
+        return {"pdf": pdf_name, "status": "review",
+                "reason": "Missing info.csv tickers: {}".format(", ".join(missing))}
+
+    return {"pdf": pdf_name, "status": "clean", "period": period,
+            "cash_in": cash_in, "cash_out": cash_out, "equities": equities}
+
+def find_pdfs(statement_dir):
+    return sorted(os.path.join(statement_dir, f) for f in os.listdir(statement_dir)
+                  if f.lower().endswith(".pdf"))
+
+def read_review_queue():
+    if not os.path.exists(REVIEW_QUEUE):
+        return pd.DataFrame(columns = REVIEW_COLUMNS)
+    return pd.read_csv(REVIEW_QUEUE)
+
+def write_review_queue(queue_df):
+    queue_df.to_csv(REVIEW_QUEUE, index = False)
+
+def queue_for_review(flagged, num_word_name):
+    if len(flagged) == 0:
+        return
+    queue_df = read_review_queue()
+    new_df = pd.DataFrame({"pdf": [r["pdf"] for r in flagged],
+                           "num_word_name": [num_word_name]*len(flagged),
+                           "reason": [r["reason"] for r in flagged]})
+    # a statement is only queued once, keep the most recent reason
+    queue_df = queue_df[~queue_df.pdf.isin(new_df.pdf)]
+    write_review_queue(pd.concat([queue_df, new_df], axis = 0))
+
+def commit_statements(clean):
+    # append every clean statement with a single upsert per ledger. statements
+    # whose period already exists are flagged since update_ledger would have
+    # asked whether to replace them
+    cash_in_ledger = ledger.open_ledger("cash_paid_in")
+    info_df = ledger.open_ledger("info").read()
+
+    seen = set()
+    new_in, new_out, new_holdings, committed, flagged = [], [], [], [], []
+    for result in clean:
+        start, end = read_pdf.period_strings(result["period"])
+        if (start, end) in seen or cash_in_ledger.exists({"Start": start, "End": end}):
+            flagged.append({"pdf": result["pdf"], "status": "review",
+                            "reason": "There already exists an entry for the "
+                                      "statement period: {}, {}".format(start, end)})
+            continue
+        seen.add((start, end))
+        new_in.append(read_pdf.statement_row(result["period"], result["cash_in"]))
+        new_out.append(read_pdf.statement_row(result["period"], result["cash_out"]))
+        new_holdings.append(pd.merge(result["equities"].sort_values(by = 'ticker'),
+                                     info_df, on = 'ticker', how = 'left'))
+        committed.append(result["pdf"])
+
+    if len(committed) != 0:
+        snapshot = summary_snapshot.load()
+        cash_in_ledger.upsert(pd.concat(new_in, axis = 0))
+        ledger.open_ledger("cash_paid_out").upsert(pd.concat(new_out, axis = 0))
+        ledger.open_ledger("holdings").upsert(pd.concat(new_holdings, axis = 0),
+                                              replace_on = ["date"])
+        summary_snapshot.update(snapshot, [(cash_in.iloc[0], cash_out.iloc[0], holdings)
+                                           for cash_in, cash_out, holdings
+                                           in zip(new_in, new_out, new_holdings)])
+    return committed, flagged
+
+def ingest(statement_dir, num_word_name, max_workers = None):
+    pdfs = find_pdfs(statement_dir)
+    if len(pdfs) == 0:
+        read_pdf.warn("No PDFs found in {}".format(statement_dir))
+        return
+    with ProcessPoolExecutor(max_workers = max_workers,
+                             initializer = init_worker) as pool:
+        results = list(pool.map(parse_deferred, pdfs, [num_word_name]*len(pdfs)))
+
+    clean = [r for r in results if r["status"] == "clean"]
+    flagged = [r for r in results if r["status"] == "review"]
+    committed, duplicates = commit_statements(clean)
+    flagged += duplicates
+    queue_for_review(flagged, num_word_name)
+
+    print("-------------------------------------------------")
+    print("Committed {} statement(s)".format(len(committed)))
+    for pdf_name in committed:
+        print("  {}".format(pdf_name))
+    print("Queued {} statement(s) for review in {}".format(len(flagged), REVIEW_QUEUE))
+    for result in flagged:
+        print("  {}: {}".format(result["pdf"], result["reason"]))
+    print("-------------------------------------------------")
+
+def review():
+    # resolve every queued statement interactively, one after another
+    queue_df = read_review_queue()
+    if len(queue_df) == 0:
+        print("Review queue is empty")
+        return
+    for _, row in queue_df.iterrows():
+        print("-------------------------------------------------")
+        print("Reviewing {}: {}".format(row["pdf"], row["reason"]))
+        read_pdf.main(row["pdf"], int(row["num_word_name"]))
+        # drop the statement as soon as it is resolved so an interrupted review
+        # pass can be picked up again
+        queue_df = queue_df[queue_df.pdf != row["pdf"]]
+        write_review_queue(queue_df)
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--review":
+        review()
+    else:
+        ingest(sys.argv[1], int(sys.argv[2]))
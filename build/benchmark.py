@@ -0,0 +1,180 @@
+import os
+import io
+import sys
+import json
+import random
+import shutil
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+
+import ledger
+import holdings_index
+import profiling
+import read_pdf
+import summary_snapshot
+import synthetic_statement
+
+
+# Times each phase of read_pdf.main on synthetic statements, and of the summary
+# (summary_snapshot.rebuild, make_summary.main) on large synthetic ledgers, then
+# compares against the stored baseline.
+#   python build/benchmark.py            compare against benchmark_baseline.json
+#   python build/benchmark.py --update   store the current timings as baseline
+#   python build/benchmark.py --profile  also print call counts, as JSON
+# Timings depend on the machine, re-run with --update after moving machines.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "benchmark_baseline.json")
+# a phase fails when it is this many times slower than its baseline, plus a
+# few milliseconds so very short phases do not fail on noise
+TOLERANCE = 1.5
+SLACK = 0.005
+# best of this many runs is kept
+REPEATS = 3
+
+PARSER_CASES = {"parse_small": dict(count = 4, holdings = 10, activity = 20, pages = 3),
+                "parse_large": dict(count = 4, holdings = 80, activity = 400,
+                                    pages = 30)}
+SUMMARY_CASES = {"summary_large": dict(statements = 240, holdings = 60)}
+NUM_WORD_NAME = len(synthetic_statement.OWNER.split())
+# regions of the generated ledgers
+TARGET = {"region": {"CAN": 25.0, "US": 50.0, "INT": 25.0}}
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    # empty ledgers in a temporary working directory
+    cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix = "ws_benchmark_")
+    try:
+        os.chdir(path)
+        os.makedirs(ledger.DATA_DIR)
+        for table, (columns, _, _) in ledger.TABLES.items():
+            pd.DataFrame(columns = columns).to_csv(os.path.join(ledger.DATA_DIR,
+                                                   table + ".csv"), index = False)
+        yield path
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(path)
+
+def write_info(tickers):
+    pd.DataFrame({"ticker": tickers, "region": "US", "type": "ETF",
+                  "sector": "index"}).to_csv("data/info.csv", index = False)
+
+def run_parser(case, calls):
+    with scratch_dir():
+        paths, tickers = synthetic_statement.make_statements("statements", **case)
+        write_info(tickers)
+        # generated statements reconcile, any prompt is a parser bug
+        read_pdf.defer_prompts = True
+        profiling.enable(calls)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in paths:
+                read_pdf.main(path, NUM_WORD_NAME)
+        read_pdf.defer_prompts = False
+        return profiling.report()
+
+def write_ledgers(statements, holdings):
+    rng = np.random.default_rng(0)
+    starts = pd.date_range("2000-01-01", periods = statements, freq = "MS")
+    start = starts.strftime('%Y-%m-%d')
+    end = (starts + pd.offsets.MonthEnd(0)).strftime('%Y-%m-%d')
+    deposits = rng.choice([0, 500, 1000], statements).astype(float)
+    withdrawals = rng.choice([0, 0, 0, 800], statements).astype(float)
+    value = np.cumsum(deposits - withdrawals + 1000)*rng.uniform(1, 1.1, statements)
+    pd.DataFrame({"Start": start, "End": end, "Cash": 10.0, "Total Portfolio": value,
+                  "Deposits": deposits, "Dividends": 1.0}).to_csv(
+                  "data/cash_paid_in.csv", index = False)
+    pd.DataFrame({"Start": start, "End": end, "Taxes": 0.1,
+                  "Withdrawals": withdrawals}).to_csv("data/cash_paid_out.csv",
+                                                      index = False)
+    tickers = synthetic_statement.make_tickers(random.Random(0), holdings)
+    weights = rng.dirichlet(np.ones(holdings))
+    pd.DataFrame({"date": np.repeat(end, holdings),
+                  "ticker": np.tile(tickers, statements),
+                  "total_quantity": 10.0, "market_price": 1.0, "currency": "CAD",
+                  "market_value": np.outer(value - 10, weights).ravel(),
+                  "book_cost": np.outer(value, weights).ravel(),
+                  "region": np.tile(rng.choice(["US", "CAN", "INT"], holdings), statements),
+                  "type": "ETF",
+                  "sector": np.tile(rng.choice(["tech", "finance", "index"], holdings),
+                                    statements)}).to_csv("data/holdings.csv",
+                                                         index = False)
+    write_info(tickers)
+
+def run_summary(case, calls):
+    # a full rebuild of data/summary.json from the ledgers, a text summary and a
+    # summary with plots read from it, then the drift of every statement date
+    import make_summary
+    with scratch_dir():
+        write_ledgers(**case)
+        profiling.enable(calls)
+        profiling.phase("rebuild")
+        summary_snapshot.rebuild()
+        profiling.phase(None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_summary.main()
+            make_summary.main(plot_dir = "plots")
+        profiling.phase("holdings_index")
+        index = holdings_index.load_index()
+        index.drift(TARGET)
+        index.unrealized_return()
+        profiling.phase(None)
+        return profiling.report()
+
+def run_all(calls):
+    # best of REPEATS runs of every case, in seconds per run of each phase
+    # (i.e. per statement for the parser)
+    results = {}
+    reports = {}
+    cases = [(name, run_parser, case) for name, case in PARSER_CASES.items()]
+    cases += [(name, run_summary, case) for name, case in SUMMARY_CASES.items()]
+    for name, run, case in cases:
+        best = {}
+        for _ in range(REPEATS):
+            report = run(case, calls)
+            for phase, stat in report["phases"].items():
+                seconds = stat["seconds"]/stat["runs"]
+                best[phase] = min(best.get(phase, seconds), seconds)
+        best["total"] = sum(best.values())
+        results[name] = {phase: round(seconds, 6) for phase, seconds in best.items()}
+        reports[name] = report
+    return results, reports
+
+def compare(results, baseline):
+    failed = []
+    print("{:<15} {:<14} {:>11} {:>11}".format("case", "phase", "baseline", "current"))
+    for name, phases in results.items():
+        for phase, seconds in phases.items():
+            base = baseline.get(name, {}).get(phase)
+            status = ""
+            if base is not None and seconds > base*TOLERANCE + SLACK:
+                status = "SLOWER"
+                failed.append("{}/{}".format(name, phase))
+            print("{:<15} {:<14} {:>11} {:>11.6f} {}".format(
+                  name, phase, "-" if base is None else "{:.6f}".format(base),
+                  seconds, status))
+    return failed
+
+def main(args):
+    results, reports = run_all(calls = "--profile" in args)
+    if "--profile" in args:
+        print(json.dumps(reports, indent = 2))
+    if "--update" in args or not os.path.exists(BASELINE):
+        with open(BASELINE, "w") as f:
+            json.dump(results, f, indent = 2)
+            f.write("\n")
+        print("Wrote baseline: {}".format(BASELINE))
+        return
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    failed = compare(results, baseline)
+    if len(failed) != 0:
+        # nonzero exit status so a regression fails the run
+        read_pdf.error_system_exit("Slower than baseline: {}".format(", ".join(failed)), 1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
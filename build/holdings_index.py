@@ -0,0 +1,141 @@
+import sys
+import numpy as np
+import pandas as pd
+import ledger
+import target_allocation
+
+
+# Dense date x ticker view of the holdings ledger: one row per statement date,
+# one column per ticker ever held (0 where it was not held), with the info.csv
+# attributes of every ticker. A ticker's history is a column, and the allocation
+# of every statement date is a single matrix product instead of a groupby per date.
+#   python build/holdings_index.py ticker {ticker}
+#   python build/holdings_index.py unrealized
+#   python build/holdings_index.py allocation [region|type|sector]
+#   python build/holdings_index.py drift
+
+
+class HoldingsIndex:
+    def __init__(self, holdings_df, info_df, cash_in_df = None):
+        self.dates, date_idx = np.unique(holdings_df["date"].astype(str).values,
+                                         return_inverse = True)
+        self.tickers, ticker_idx = np.unique(holdings_df["ticker"].astype(str).values,
+                                             return_inverse = True)
+        self.column = {ticker: j for j, ticker in enumerate(self.tickers)}
+
+        shape = (len(self.dates), len(self.tickers))
+        self.held = np.zeros(shape, dtype = bool)
+        self.held[date_idx, ticker_idx] = True
+        self.quantity = np.zeros(shape)
+        self.quantity[date_idx, ticker_idx] = holdings_df["total_quantity"].fillna(0).values
+        self.market_value = np.zeros(shape)
+        self.market_value[date_idx, ticker_idx] = holdings_df["market_value"].fillna(0).values
+        self.book_cost = np.zeros(shape)
+        self.book_cost[date_idx, ticker_idx] = holdings_df["book_cost"].fillna(0).values
+
+        # attributes of each ticker from info.csv, else from its last holding.
+        # codes[attribute][j] is the category of ticker j
+        info = info_df.drop_duplicates("ticker", keep = "last").set_index("ticker")
+        last = (holdings_df.sort_values(by = "date").drop_duplicates("ticker", keep = "last")
+                .set_index("ticker"))
+        self.categories = {}
+        self.codes = {}
+        for attribute in target_allocation.ATTRIBUTES:
+            values = (info[attribute].reindex(self.tickers)
+                      .fillna(last[attribute].reindex(self.tickers))
+                      .fillna("Unknown").astype(str).values)
+            self.categories[attribute], self.codes[attribute] = np.unique(
+                values, return_inverse = True)
+
+        # "Total Portfolio" (cash included) of each date, as the % of portfolio in
+        # make_summary.py, else the value of the holdings
+        self.portfolio_value = self.market_value.sum(axis = 1)
+        if cash_in_df is not None and len(cash_in_df) != 0:
+            total = (cash_in_df.drop_duplicates("End", keep = "last").set_index("End")
+                     ["Total Portfolio"].reindex(self.dates).values.astype(float))
+            self.portfolio_value = np.where(np.isnan(total), self.portfolio_value, total)
+
+    def ticker_history(self, ticker):
+        # every statement date 'ticker' was held on
+        j = self.column[ticker]
+        held = self.held[:, j]
+        value = self.market_value[held, j]
+        cost = self.book_cost[held, j]
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            gain = np.where(cost != 0, value/cost - 1, np.nan)
+        return pd.DataFrame({"date": self.dates[held], "Quantity": self.quantity[held, j],
+                             "Value ($)": value, "Book Cost ($)": cost,
+                             "Return (%)": gain*100})
+
+    def unrealized_return(self):
+        # market value over book cost - 1, per (date, ticker) (NaN where not
+        # held) and for all the holdings of each date
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            per_ticker = np.where(self.held & (self.book_cost != 0),
+                                  self.market_value/self.book_cost - 1, np.nan)
+            cost = self.book_cost.sum(axis = 1)
+            total = np.where(cost != 0, self.market_value.sum(axis = 1)/cost - 1, np.nan)
+        return per_ticker, total
+
+    def allocation(self, attribute):
+        # categories, and the % of the portfolio in each of them for every date
+        categories = self.categories[attribute]
+        one_hot = np.zeros((len(self.tickers), len(categories)))
+        one_hot[np.arange(len(self.tickers)), self.codes[attribute]] = 1
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            return categories, (self.market_value @ one_hot)/self.portfolio_value[:, None]*100
+
+    def drift(self, target):
+        # {attribute: (categories, actual - target % for every date)}. the target
+        # categories come first, followed by anything else held (a target of 0)
+        # when the targets are complete
+        result = {}
+        for attribute, goals in target.items():
+            categories, actual = self.allocation(attribute)
+            column = {category: k for k, category in enumerate(categories)}
+            names = target_allocation.categories(goals, categories)
+            drift = np.zeros((len(self.dates), len(names)))
+            for k, name in enumerate(names):
+                if name in column:
+                    drift[:, k] = actual[:, column[name]]
+                drift[:, k] -= goals.get(name, 0.0)
+            result[attribute] = (names, drift)
+        return result
+
+def load_index():
+    return HoldingsIndex(ledger.open_ledger("holdings").read(),
+                         ledger.open_ledger("info").read(),
+                         ledger.open_ledger("cash_paid_in").read())
+
+def print_table(dates, columns, matrix):
+    df = pd.DataFrame(matrix, columns = columns)
+    df.insert(0, "date", dates)
+    print(df.to_string(index = False, float_format = "{:.2f}".format))
+
+if __name__ == "__main__":
+    index = load_index()
+    if sys.argv[1] == "ticker":
+        print(index.ticker_history(sys.argv[2]).to_string(
+              index = False, float_format = "{:.2f}".format))
+    elif sys.argv[1] == "unrealized":
+        _, total = index.unrealized_return()
+        print_table(index.dates, ["Unrealized Return (%)"], total[:, None]*100)
+    elif sys.argv[1] == "allocation":
+        attribute = sys.argv[2] if len(sys.argv) > 2 else "region"
+        categories, allocation = index.allocation(attribute)
+        print_table(index.dates, list(categories), allocation)
+    elif sys.argv[1] == "drift":
+        target = target_allocation.read_target()
+        if len(target) == 0:
+            print("No target allocation, see {}".format(target_allocation.TARGET_FILE))
+        for attribute, (names, drift) in index.drift(target).items():
+            print("---------------------- {} DRIFT (%) ----------------------"
+                  .format(attribute.upper()))
+            print_table(index.dates, names, drift)
+            if len(index.dates) == 0:
+                continue
+            worst = np.abs(drift).max(axis = 1)
+            print("Largest drift: {:.2f}% on {}".format(worst.max(), index.dates[worst.argmax()]))
+    else:
+        print("Unknown command: {}. Expected ticker, unrealized, allocation or drift"
+              .format(sys.argv[1]))
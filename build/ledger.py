@@ -0,0 +1,223 @@
+import os
+import sys
+import sqlite3
+import pandas as pd
+
+
+# where the ledgers are kept:
+#   "csv"   : data/*.csv, as they always have been
+#   "sqlite": data/ledger.db, indexed on (Start, End) and (date, ticker)
+# switch with the WS_LEDGER environment variable, and move the data between
+# the two with: python build/ledger.py import|export
+BACKEND = os.environ.get("WS_LEDGER", "csv")
+DATA_DIR = "data"
+DB_NAME = "ledger.db"
+
+# table: (columns, key, sort column)
+TABLES = {"cash_paid_in": (["Start", "End", "Cash", "Total Portfolio", "Deposits",
+                            "Dividends"], ["Start", "End"], "Start"),
+          "cash_paid_out": (["Start", "End", "Taxes", "Withdrawals"],
+                            ["Start", "End"], "Start"),
+          "holdings": (["date", "ticker", "total_quantity", "market_price", "currency",
+                        "market_value", "book_cost", "region", "type", "sector"],
+                       ["date", "ticker"], None),
+          "info": (["ticker", "region", "type", "sector"], ["ticker"], "ticker")}
+TEXT_COLUMNS = ["Start", "End", "date", "ticker", "currency", "region", "type",
+                "sector"]
+
+
+def normalize(table, new_df):
+    # dates may come in as datetime.date, keys are always compared as text
+    new_df = new_df[TABLES[table][0]].copy()
+    for col in new_df.columns:
+        if col in TEXT_COLUMNS:
+            new_df[col] = new_df[col].where(new_df[col].isna(), new_df[col].astype(str))
+    return new_df
+
+def key_mask(df, cols, new_df):
+    # rows of df whose 'cols' values appear in new_df
+    return pd.MultiIndex.from_frame(df[cols]).isin(
+           pd.MultiIndex.from_frame(new_df[cols].drop_duplicates()))
+
+def filter_mask(df, where, between):
+    mask = pd.Series(True, index = df.index)
+    for col, value in (where or {}).items():
+        mask &= (df[col] == value)
+    if between is not None:
+        col, low, high = between
+        mask &= (df[col] >= low) & (df[col] <= high)
+    return mask
+
+
+class CsvLedger:
+    def __init__(self, table):
+        self.table = table
+        self.columns, self.key, self.sort_by = TABLES[table]
+        self.path = os.path.join(DATA_DIR, table + ".csv")
+
+    def read(self):
+        return pd.read_csv(self.path)
+
+    def select(self, where = None, between = None):
+        df = self.read()
+        return df[filter_mask(df, where, between)]
+
+    def exists(self, where):
+        # only the columns being checked are parsed
+        df = pd.read_csv(self.path, usecols = list(where), dtype = str)
+        return bool(filter_mask(df, where, None).any())
+
+    def latest(self, column):
+        df = pd.read_csv(self.path, usecols = [column], dtype = str)
+        return df[column].max() if len(df) != 0 else None
+
+    def append(self, new_df):
+        # ledgers written before ledger.py existed do not always follow the
+        # TABLES column order (e.g. info.csv as ticker,region,sector,type), so
+        # rows are appended in the order of the file's own header
+        new_df = normalize(self.table, new_df)
+        header = list(pd.read_csv(self.path, nrows = 0).columns)
+        if sorted(header) != sorted(self.columns):
+            df = pd.concat([self.read(), new_df], axis = 0)
+            df.to_csv(self.path, index = False)
+            return
+        # a file edited by hand may not end in a newline, the first new row
+        # would then be glued onto its last row
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() != 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        new_df[header].to_csv(self.path, mode = "a", header = False, index = False)
+
+    def upsert(self, new_df, replace_on = None):
+        # replaces the rows sharing 'replace_on' (default: the key) with new_df.
+        # when nothing is replaced and new_df sorts after the ledger, it is
+        # simply appended to the file
+        replace_on = replace_on or self.key
+        new_df = normalize(self.table, new_df)
+        cols = list(dict.fromkeys(replace_on + ([self.sort_by] if self.sort_by else [])))
+        keys = pd.read_csv(self.path, usecols = cols, dtype = str)
+        conflict = key_mask(keys, replace_on, new_df)
+        in_order = (self.sort_by is None or len(keys) == 0 or
+                    new_df[self.sort_by].min() >= keys[self.sort_by].max())
+        if not conflict.any() and in_order:
+            self.append(new_df)
+            return
+        df = self.read()
+        df = pd.concat([df[~conflict], new_df], axis = 0)
+        if self.sort_by is not None:
+            df = df.sort_values(by = self.sort_by, kind = "stable")
+        df.to_csv(self.path, index = False)
+
+    def replace_all(self, df):
+        normalize(self.table, df).to_csv(self.path, index = False)
+
+
+class SqliteLedger:
+    def __init__(self, table):
+        self.table = table
+        self.columns, self.key, self.sort_by = TABLES[table]
+        self.path = os.path.join(DATA_DIR, DB_NAME)
+        self.con = sqlite3.connect(self.path)
+        self.create()
+
+    def create(self):
+        cols = ", ".join('"{}" {}'.format(col, "TEXT" if col in TEXT_COLUMNS else "REAL")
+                         for col in self.columns)
+        key = ", ".join('"{}"'.format(col) for col in self.key)
+        with self.con:
+            self.con.execute('CREATE TABLE IF NOT EXISTS {} ({})'.format(self.table, cols))
+            self.con.execute('CREATE UNIQUE INDEX IF NOT EXISTS {0}_key ON {0} ({1})'
+                             .format(self.table, key))
+
+    def where_sql(self, where, between):
+        clauses, params = [], []
+        for col, value in (where or {}).items():
+            clauses.append('"{}" = ?'.format(col))
+            params.append(value)
+        if between is not None:
+            col, low, high = between
+            clauses.append('"{}" BETWEEN ? AND ?'.format(col))
+            params += [low, high]
+        if len(clauses) == 0:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def read(self):
+        return self.select()
+
+    def select(self, where = None, between = None):
+        sql, params = self.where_sql(where, between)
+        order = ", ".join('"{}"'.format(col) for col in
+                          ([self.sort_by] if self.sort_by else []) + self.key)
+        cols = ", ".join('"{}"'.format(col) for col in self.columns)
+        return pd.read_sql_query("SELECT {} FROM {}{} ORDER BY {}".format(
+                                 cols, self.table, sql, order), self.con, params = params)
+
+    def exists(self, where):
+        sql, params = self.where_sql(where, None)
+        return self.con.execute("SELECT 1 FROM {}{} LIMIT 1".format(
+                                self.table, sql), params).fetchone() is not None
+
+    def latest(self, column):
+        return self.con.execute('SELECT MAX("{}") FROM {}'.format(
+                                column, self.table)).fetchone()[0]
+
+    def rows(self, df):
+        # plain python values for sqlite3 (no numpy scalars, NaN as NULL)
+        return [tuple(None if pd.isna(v) else (v.item() if hasattr(v, "item") else v)
+                      for v in row) for row in df.itertuples(index = False)]
+
+    def insert_sql(self):
+        return 'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(self.table,
+               ", ".join('"{}"'.format(col) for col in self.columns),
+               ", ".join("?"*len(self.columns)))
+
+    def append(self, new_df):
+        with self.con:
+            self.con.executemany(self.insert_sql(), self.rows(normalize(self.table,
+                                                                        new_df)))
+
+    def upsert(self, new_df, replace_on = None):
+        # replaces the rows sharing 'replace_on' (default: the key) with new_df,
+        # in a single transaction
+        replace_on = replace_on or self.key
+        new_df = normalize(self.table, new_df)
+        delete = "DELETE FROM {} WHERE {}".format(self.table, " AND ".join(
+                 '"{}" = ?'.format(col) for col in replace_on))
+        with self.con:
+            self.con.executemany(delete, self.rows(new_df[replace_on].drop_duplicates()))
+            self.con.executemany(self.insert_sql(), self.rows(new_df))
+
+    def replace_all(self, df):
+        with self.con:
+            self.con.execute("DELETE FROM {}".format(self.table))
+            self.con.executemany(self.insert_sql(), self.rows(normalize(self.table, df)))
+
+
+def open_ledger(table):
+    if BACKEND == "sqlite":
+        return SqliteLedger(table)
+    return CsvLedger(table)
+
+def import_csv():
+    # data/*.csv -> data/ledger.db
+    for table in TABLES:
+        SqliteLedger(table).replace_all(CsvLedger(table).read())
+        print("Imported {}.csv".format(table))
+
+def export_csv():
+    # data/ledger.db -> data/*.csv
+    for table in TABLES:
+        CsvLedger(table).replace_all(SqliteLedger(table).read())
+        print("Exported {}.csv".format(table))
+
+if __name__ == "__main__":
+    if sys.argv[1] == "import":
+        import_csv()
+    elif sys.argv[1] == "export":
+        export_csv()
+    else:
+        print("Unknown command: {}. Expected import or export".format(sys.argv[1]))
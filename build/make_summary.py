@@ -1,10 +1,29 @@
-import pandas as pd
-import numpy as np
-from scipy.optimize import minimize_scalar
-import matplotlib.pyplot as plt
+import os
+import sys
+import json
+import summary_snapshot
+import target_allocation
+import profiling
+
+# pandas and matplotlib are only imported to draw plots (--plot), the text and
+# JSON summaries are read straight from data/summary.json (see summary_snapshot.py)
+#   python build/make_summary.py                  summary as text
+#   python build/make_summary.py --json           summary as JSON
+#   python build/make_summary.py --plot [dir]     also write the plots (default: plots/)
+#   python build/make_summary.py --rebuild        rebuild data/summary.json first
+PLOT_DIR = "plots"
+
+
+def pyplot():
+    # plots are always written to files, never shown
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
 
 
 def plot_return_percent(df, df_out):
+    plt = pyplot()
     # Calculate cumulative sum of 'Deposits' column
     df['Cumulative Deposits'] = df['Deposits'].cumsum()
     # Calculate cumulative sum of 'Withdrawals' column
@@ -38,9 +57,10 @@ def plot_return_percent(df, df_out):
 
     ax1.grid(True)
     fig.tight_layout()
-    plt.show()
+    return fig
 
 def plot_return_money(df, df_out):
+    plt = pyplot()
     # Calculate cumulative sum of 'Deposits' column
     df['Cumulative Deposits'] = df['Deposits'].cumsum()
     # Calculate cumulative sum of 'Withdrawals' column
@@ -70,122 +90,237 @@ def plot_return_money(df, df_out):
 
     ax1.grid(True)
     fig.tight_layout()
-    plt.show()
+    return fig
 
 
-def calc_annual_compounded_rate(df, total_portfolio_value):
-    # Convert 'Date' column to datetime
-    # taking the 'Start' of statement period to be the deposit date, even
-    # though its between 'Start' and 'End'
-    df['Date'] = pd.to_datetime(df['Start'])
+def plot_rolling_returns(rolling_df):
+    plt = pyplot()
+    fig, ax1 = plt.subplots()
+    # per statement returns as bars, rolling (annualized) returns as lines
+    ax1.bar(rolling_df['End'], rolling_df['Period Return'], width=20, color='grey',
+            alpha=0.5, label='Statement period')
+    ax1.plot(rolling_df['End'], rolling_df['Rolling TWR'], marker='o', color='b',
+             linestyle='-', label='Rolling time-weighted (annualized)')
+    ax1.plot(rolling_df['End'], rolling_df['Rolling IRR'], marker='o', color='r',
+             linestyle='-', label='Rolling money-weighted (annualized)')
+    ax1.set_ylabel('Return (%)')
+    ax1.set_xlabel('Date')
+    yticks=ax1.get_yticks()
+    ylabels = ["{:.1f}".format(tick*100) for tick in yticks]
+    ax1.set_yticks(ticks = yticks, labels = ylabels)
+    ax1.legend(loc='upper left')
 
-    # Calculate the time difference in years
-    # (most recent date) - (deposit date) <- converted to years
-    df['Years_Invested'] = ((df['Date'].max() - df['Date']).dt.days)/365
-
-    # Define the objective function to minimize
-    def objective_function(rate):
-        # taking absolute values ensures that the objective_function is is >= 0
-        # .mul is element-wise multiplication
-        # this looks like (deposit value)*(rate of return)^(years deposit is invested)
-        # summed over all deposits
-        return np.abs(df['Deposits'].mul((1 + rate)**(df['Years_Invested'])).sum() 
-                      - total_portfolio_value)
-
-    # Find the rate that minimizes the difference between the sum of compounded 
-    # deposits and the total portfolio value. NOTE, I am assuming here that
-    # your rate is between 0 and 100% (compounded annually), if you have a
-    # greater performance than this, change the bounds to (0,x) where x is your
-    # maximum possible compounded rate of return
-    result = minimize_scalar(objective_function, method='bounded', bounds=(0, 1))
-
-    # The result x is the annual compounded rate
-    annual_compounded_rate = result.x*100
-
-    # sanity check
-    value = 0
-    for _, row in df.iterrows():
-        value += row['Deposits']*((1+result.x)**row['Years_Invested'])
-    if (value > total_portfolio_value - 1 and 
-        value < total_portfolio_value + 1):
-        pass
-    else:
-        print("Expected value: {} =?= {} (actual value)".format(value,
-              total_portfolio_value))
-
-    return annual_compounded_rate
-
-
-def main():
-    # read in data
-    holdings_df = pd.read_csv("data/holdings.csv")
-    cash_in_df = pd.read_csv("data/cash_paid_in.csv")
-    cash_out_df = pd.read_csv("data/cash_paid_out.csv")
-    # make sure everything is ordered correctly by data
-    cash_in_df.sort_values(by="End",inplace=True)
-    cash_out_df.sort_values(by="End",inplace=True)
-    # grab the most recent date
-    cur_period = cash_in_df.End.values[-1]
-    # grab current holdings
-    holdings_df = holdings_df[holdings_df.date == cur_period]
+    ax1.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def percent(value, total):
+    if value is None or not total:
+        return None
+    return value/total*100
+
+def two_decimals(value):
+    # None is a NaN that went through JSON
+    return "nan" if value is None else "{:.2f}".format(value)
+
+def table(rows, columns):
+    # right aligned columns, like DataFrame.to_string(index=False)
+    cells = [["NaN" if row[col] is None else "{:.2f}".format(row[col])
+              if isinstance(row[col], float) else str(row[col]) for col in columns]
+             for row in rows]
+    widths = [max([len(col)] + [len(cell[i]) for cell in cells])
+              for i, col in enumerate(columns)]
+    lines = ["  ".join(col.rjust(width) for col, width in zip(columns, widths))]
+    lines += ["  ".join(cell.rjust(width) for cell, width in zip(row, widths))
+              for row in cells]
+    return "\n".join(lines)
+
+def allocation(totals, name, cur_port_value):
+    rows = [{name: key, "% of portfolio": percent(value, cur_port_value)}
+            for key, value in totals.items()]
+    return sorted(rows, key = lambda row: -(row["% of portfolio"] or 0))
+
+def target_drift(latest, target, cur_port_value):
+    # actual vs target % of the latest statement, per attribute of the target
+    # (see holdings_index.py for the drift over every statement)
+    drift = {}
+    for attribute, goals in target.items():
+        totals = latest.get(attribute, {})
+        rows = []
+        for name in target_allocation.categories(goals, totals):
+            actual = percent(totals.get(name, 0.0), cur_port_value)
+            goal = goals.get(name, 0.0)
+            rows.append({attribute.capitalize(): name, "Actual (%)": actual,
+                         "Target (%)": goal,
+                         "Drift (%)": None if actual is None else actual - goal})
+        drift[attribute] = rows
+    return drift
+
+def summarize(snapshot):
+    latest = snapshot["latest"]
+    last = snapshot["statements"][-1]
     # current portfolio value
-    cur_port_value = cash_in_df.loc[cash_in_df.End == cur_period]["Total Portfolio"].values[0]
+    cur_port_value = latest["Total Portfolio"]
     # total portfolio value is equal to current Total Portfolio value plus all
     # withdrawals (== crystalied gains)
-    tot_port_value = cur_port_value + cash_out_df.Withdrawals.sum()
-    # calculate % of portfolio and return ($,%) for each holding
-    holdings_df["% of portfolio"] = (holdings_df.market_value/cur_port_value)*100
-    holdings_df["Return (%)"] = (holdings_df.market_value/holdings_df.book_cost - 1)*100
-    holdings_df["Return ($)"] = (holdings_df.market_value - holdings_df.book_cost)
-    holdings_df.sort_values(by="Return (%)", ascending=False, inplace=True)
-    # for nicer formatting
-    holdings_df.rename(columns={'ticker': 'Ticker'}, inplace=True)
-    holdings_df.rename(columns={'market_value': 'Value ($)'}, inplace=True)
-    holdings_df.rename(columns={'total_quantity': 'Quantity'}, inplace=True)
-
+    tot_port_value = cur_port_value + last["Cumulative Withdrawals"]
+    deposits = last["Cumulative Deposits"]
+
+    # % of portfolio and return ($,%) for each holding
+    holdings = []
+    for holding in latest["holdings"]:
+        value, cost = holding["market_value"], holding["book_cost"]
+        gain = None if value is None or cost is None else value - cost
+        holdings.append({"Ticker": holding["ticker"],
+                         "Return (%)": percent(gain, cost),
+                         "Return ($)": gain,
+                         "% of portfolio": percent(value, cur_port_value),
+                         "Quantity": holding["total_quantity"],
+                         "Value ($)": value})
+    holdings.sort(key = lambda row: -(row["Return (%)"] or 0))
+
+    rates = snapshot["returns"]
+    rolling = [{"End": row["End"],
+                "Period (%)": percent(row["Period Return"], 1),
+                "TWR (%)": percent(row["Rolling TWR"], 1),
+                "IRR (%)": percent(row["Rolling IRR"], 1)}
+               for row in rates["rolling"][-rates["window"]:]]
+
+    return {"period": latest["End"],
+            "holdings": holdings,
+            "cash": latest["Cash"],
+            "sector": allocation(latest["sector"], "Sector", cur_port_value),
+            "region": allocation(latest["region"], "Region", cur_port_value),
+            "target": target_drift(latest, snapshot["target"], cur_port_value),
+            "performance": {
+                "Deposits": deposits,
+                "Withdrawals": last["Cumulative Withdrawals"],
+                "Current Portfolio Value": cur_port_value,
+                "Total Return ($)": tot_port_value - deposits,
+                "Total Return (%)": percent(tot_port_value - deposits, deposits),
+                "Money-weighted return (%)": percent(rates["money_weighted"], 1),
+                "Money-weighted annualized return (%)":
+                    percent(rates["money_weighted_annual"], 1),
+                "Time-weighted return (%)": percent(rates["time_weighted"], 1),
+                "Time-weighted annualized return (%)":
+                    percent(rates["time_weighted_annual"], 1)},
+            "rolling_window": rates["window"],
+            "rolling": rolling,
+            "dividends": last["Cumulative Dividends"],
+            "taxes": last["Cumulative Taxes"]}
+
+def print_summary(summary):
+    cur_period = summary["period"]
+    performance = summary["performance"]
     print("\n---------------------- {} HOLDINGS ----------------------".format(cur_period))
-    print(holdings_df[["Ticker", "Return (%)", "Return ($)", "% of portfolio", "Quantity", "Value ($)"]].to_string(index=False))
-    print("Cash: ${:.2f}".format(cash_in_df[cash_in_df.End == cur_period].Cash.values[0]))
+    print(table(summary["holdings"], ["Ticker", "Return (%)", "Return ($)",
+                                      "% of portfolio", "Quantity", "Value ($)"]))
+    print("Cash: ${}".format(two_decimals(summary["cash"])))
     print("-----------------------------------------------------------------\n")
 
-    sector_df = holdings_df.groupby(by = "sector")['Value ($)'].sum().reset_index()
-    sector_df["% of portfolio"] = (sector_df['Value ($)']/cur_port_value)*100
-    sector_df.sort_values(by="% of portfolio", ascending=False, inplace=True)
-    sector_df.rename(columns={'sector': 'Sector'}, inplace=True)
-
     print("---------------------- {} SECTOR  -----------------------".format(cur_period))
-    print(sector_df[["Sector", "% of portfolio"]].to_string(index=False))
+    print(table(summary["sector"], ["Sector", "% of portfolio"]))
     print("----------------------------------------------------------------\n")
 
-    region_df = holdings_df.groupby(by = "region")['Value ($)'].sum().reset_index()
-    region_df["% of portfolio"] = (region_df['Value ($)']/cur_port_value)*100
-    region_df.sort_values(by="% of portfolio", ascending=False, inplace=True)
-    region_df.rename(columns={'region': 'Region'}, inplace=True)
-
     print("---------------------- {} REGION  ----------------------".format(cur_period))
-    print(region_df[["Region", "% of portfolio"]].to_string(index=False))
-    print("\nDesired: 25% CAD, 35% US, 15% INT, 25% Fixed")
+    print(table(summary["region"], ["Region", "% of portfolio"]))
     print("----------------------------------------------------------------\n")
 
+    for attribute, rows in summary["target"].items():
+        print("---------------------- {} TARGET {} ----------------------".format(
+              cur_period, attribute.upper()))
+        print(table(rows, [attribute.capitalize(), "Actual (%)", "Target (%)",
+                           "Drift (%)"]))
+        print("----------------------------------------------------------------\n")
+
     print("---------------------- PERFORMACE SUMMARY ----------------------")
-    print("Deposits: ${:.2f}".format(cash_in_df.Deposits.sum()))
-    print("Withdrawals: ${:.2f}".format(cash_out_df.Withdrawals.sum()))
-    print("Current Portfolio Value: ${:.2f}".format(cur_port_value))
-    print("Total Return ($): ${:.2f}".format(tot_port_value-cash_in_df.Deposits.sum()))
-    print("Total Return (%): {:.2f}%".format((tot_port_value/cash_in_df.Deposits.sum()-1)*100))
-    print("Total Annual compounded return (%): {:.2f}%".format(
-          calc_annual_compounded_rate(cash_in_df, tot_port_value)))
+    print("Deposits: ${:.2f}".format(performance["Deposits"]))
+    print("Withdrawals: ${:.2f}".format(performance["Withdrawals"]))
+    print("Current Portfolio Value: ${:.2f}".format(performance["Current Portfolio Value"]))
+    print("Total Return ($): ${:.2f}".format(performance["Total Return ($)"]))
+    print("Total Return (%): {}%".format(two_decimals(performance["Total Return (%)"])))
+    print("Money-weighted return (%): {}% ({}% annualized)".format(
+          two_decimals(performance["Money-weighted return (%)"]),
+          two_decimals(performance["Money-weighted annualized return (%)"])))
+    print("Time-weighted return (%): {}% ({}% annualized)".format(
+          two_decimals(performance["Time-weighted return (%)"]),
+          two_decimals(performance["Time-weighted annualized return (%)"])))
     print("-----------------------------------------------------------------\n")
 
+    print("------------- RETURNS (ROLLING {} STATEMENTS, ANNUALIZED) -------------"
+          .format(summary["rolling_window"]))
+    print(table(summary["rolling"], ["End", "Period (%)", "TWR (%)", "IRR (%)"]))
+    print("----------------------------------------------------------------------\n")
+
     print("---------------------- DIVIDENDS AND TAXES  ----------------------")
-    print("Dividends: ${:.2f}".format(cash_in_df.Dividends.sum()))
-    print("Taxes: ${:.2f}".format(cash_out_df.Taxes.sum()))
+    print("Dividends: ${:.2f}".format(summary["dividends"]))
+    print("Taxes: ${:.2f}".format(summary["taxes"]))
     print("------------------------------------------------------------------")
 
-    plot_return_percent(cash_in_df, cash_out_df)
-    plot_return_money(cash_in_df, cash_out_df)
-
-main()
+def plot(snapshot, plot_dir):
+    import pandas as pd
+    os.makedirs(plot_dir, exist_ok = True)
+    df = pd.DataFrame(snapshot["statements"])
+    # taking the 'Start' of statement period to be the deposit date, even
+    # though its between 'Start' and 'End'
+    df['Date'] = pd.to_datetime(df['Start'])
+    rolling_df = pd.DataFrame(snapshot["returns"]["rolling"]).astype(
+                 {"Period Return": float, "Rolling TWR": float, "Rolling IRR": float})
+    rolling_df['End'] = pd.to_datetime(rolling_df['End'])
+    paths = [os.path.join(plot_dir, name) for name in
+             ["return_percent.png", "return_money.png", "rolling_returns.png"]]
+    figs = [plot_return_percent(df, df.copy()),
+            plot_return_money(df, df.copy()),
+            plot_rolling_returns(rolling_df)]
+    # rendering the PNGs is timed on its own, it costs as much as building the figures
+    profiling.phase("savefig")
+    plt = pyplot()
+    for fig, path in zip(figs, paths):
+        fig.savefig(path)
+        plt.close(fig)
+    return paths
+
+
+def main(output = "text", plot_dir = None):
+    # output: "text" or "json". with 'plot_dir' the plots are written there too
+    profiling.phase("load")
+    snapshot = summary_snapshot.current()
+    if len(snapshot["statements"]) == 0:
+        print("No statements in the ledgers yet")
+        profiling.phase(None)
+        return
+
+    profiling.phase("report")
+    summary = summarize(snapshot)
+    if output == "json":
+        print(json.dumps(summary, indent = 2))
+    else:
+        print_summary(summary)
+
+    if plot_dir is not None:
+        profiling.phase("plot")
+        paths = plot(snapshot, plot_dir)
+        if output != "json":
+            print("\nPlots: {}".format(", ".join(paths)))
+    profiling.phase(None)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    # --profile prints per phase timings and call counts as JSON at the end
+    if "--profile" in args:
+        profiling.enable()
+    plot_dir = None
+    if "--plot" in args:
+        # the directory is optional
+        index = args.index("--plot") + 1
+        plot_dir = (args[index] if index < len(args) and not args[index].startswith("--")
+                    else PLOT_DIR)
+    if "--rebuild" in args:
+        summary_snapshot.rebuild()
+    main("json" if "--json" in args else "text", plot_dir)
+    if "--profile" in args:
+        profiling.print_report()
 
 
     #cash_in_df['Start'] = pd.to_datetime(cash_in_df['Start'])
@@ -0,0 +1,65 @@
+import os
+import json
+import time
+import cProfile
+import pstats
+
+
+# Opt-in per phase timings for read_pdf.py and make_summary.py. Nothing is
+# recorded unless enable() is called, phase() is then a no-op.
+#   python build/read_pdf.py {statement} {# words} --profile
+#   python build/make_summary.py --profile
+
+enabled = False
+timings = {}
+counts = {}
+current = None
+started = 0.0
+profiler = None
+
+
+def enable(calls = True):
+    # with 'calls', function call counts are also collected through cProfile,
+    # which slows everything down a little (so the benchmark leaves it off)
+    global enabled, profiler
+    enabled = True
+    timings.clear()
+    counts.clear()
+    if calls:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+def phase(name):
+    # ends the running phase (if any) and starts 'name', None only ends it
+    global current, started
+    if not enabled:
+        return
+    now = time.perf_counter()
+    if current is not None:
+        timings[current] = timings.get(current, 0.0) + now - started
+        counts[current] = counts.get(current, 0) + 1
+    current = name
+    started = now
+
+def call_counts():
+    # number of calls of each function defined in build/
+    if profiler is None:
+        return {}
+    profiler.disable()
+    build_dir = os.path.dirname(os.path.abspath(__file__))
+    calls = {}
+    for (path, _, func), stat in pstats.Stats(profiler).stats.items():
+        if (os.path.dirname(os.path.abspath(path)) == build_dir and
+            os.path.abspath(path) != os.path.abspath(__file__)):
+            name = "{}.{}".format(os.path.splitext(os.path.basename(path))[0], func)
+            calls[name] = stat[1]
+    return dict(sorted(calls.items(), key = lambda item: -item[1]))
+
+def report():
+    phase(None)
+    return {"phases": {name: {"seconds": round(seconds, 6), "runs": counts[name]}
+                       for name, seconds in timings.items()},
+            "calls": call_counts()}
+
+def print_report():
+    print(json.dumps(report(), indent = 2))
@@ -1,13 +1,28 @@
 import sys
 import pandas as pd
-import numpy as np
-from PyPDF2 import PdfReader 
+import token_cache
+import section_index
+import ledger
+import profiling
+import records
+import summary_snapshot
 
 
+EQUITY_COLUMNS = ["date", "ticker", "total_quantity", "market_price", "currency", 
+                  "market_value", "book_cost"]
+
+# when True, any query to the user raises ReviewNeeded instead of blocking on
+# input(). Used by batch_read.py so flagged statements go to the review queue
+defer_prompts = False
+
+class ReviewNeeded(Exception):
+    pass
 
 def check_info_equities(pdf_name, period, equities):
-    # read in information csv
-    info_df = pd.read_csv("data/info.csv")
+    # read in equity information ledger
+    info_ledger = ledger.open_ledger("info")
+    info_df = info_ledger.read()
+    known = set(info_df.ticker.values)
 
     for equity in equities.ticker:
         if equity not in info_df.ticker.values:
@@ -23,56 +38,55 @@ def check_info_equities(pdf_name, period, equities):
                 if new_equity != equity:
                     equities.loc[(equities.ticker == equity), 'ticker'] = new_equity
 
-    info_df.sort_values(by = "ticker").to_csv("data/info.csv", index = False)
+    # only the equities that were added need to be written
+    added = info_df[~info_df.ticker.isin(known)]
+    if len(added) != 0:
+        info_ledger.upsert(added.sort_values(by = "ticker"))
 
     # Merge equities and info_df based on 'ticker' column
     merged_df = pd.merge(equities, info_df, on='ticker', how='left')
 
     return merged_df
 
-def update_csv_equity(date, new_df, csv_name):
-    # read in old csv
-    df = pd.read_csv(csv_name)
+def update_ledger_equity(date, new_df, table):
+    store = ledger.open_ledger(table)
     # alphabetize
     new_df = new_df.sort_values(by = 'ticker')
-    if (len(df) == 0):
-        new_df.to_csv(csv_name, index = False)
-        return
-    if (len(df.loc[df.date == date]) != 0):
+    if store.exists({"date": date}):
         user_response = u_confirm("Updating {}. There already exists an "
                                   "entry for the date: {}. Would you "
-                                  "like to replace it?".format(csv_name, date))
-        if user_response == "y":
-            df.drop(df[df.date == date].index, inplace=True)
-        else:
-            warn("Did not update holdings.csv for the date: {}".format(date))
+                                  "like to replace it?".format(table, date))
+        if user_response != "y":
+            warn("Did not update {} for the date: {}".format(table, date))
             return
-    pd.concat([df, new_df], axis = 0).to_csv(csv_name, index = False)
+    # replaces every holding of that date
+    store.upsert(new_df, replace_on = ["date"])
 
 
-def update_csv(period, new_row, csv_name):
-    # read in old csv
-    df = pd.read_csv(csv_name)
+def period_strings(period):
     # grab start and end of statement period
     start = period.at[0, "Start"].strftime('%Y-%m-%d')
     end = period.at[0, "End"].strftime('%Y-%m-%d')
+    return start, end
+
+def statement_row(period, new_row):
+    start, end = period_strings(period)
     period_n = pd.DataFrame({"Start": [start], "End": [end]})
-    if (len(df) == 0):
-        pd.concat([period_n, new_row], axis = 1).to_csv(csv_name, index = False)
-        return
-    if (len(df.loc[(df.Start == start) & (df.End == end)]) != 0):
+    return pd.concat([period_n, new_row], axis = 1)
+
+def update_ledger(period, new_row, table):
+    store = ledger.open_ledger(table)
+    start, end = period_strings(period)
+    if store.exists({"Start": start, "End": end}):
         user_response = u_confirm("Updating {}. There already exists an "
                                   "entry for the statement period: {}, {}. Would you "
-                                  "like to replace it?".format(csv_name, start, end))
-        if user_response == "y":
-            df.drop(df[(df.Start == start) & (df.End == end)].index, inplace=True)
-        else:
-            warn("Did not update cash_paid_in.csv for the statement period: {} {}"
-                 .format(start, end))
+                                  "like to replace it?".format(table, start, end))
+        if user_response != "y":
+            warn("Did not update {} for the statement period: {} {}"
+                 .format(table, start, end))
             return
 
-    pd.concat([df, pd.concat([period_n, new_row], axis = 1)], axis = 0).sort_values(
-                             by = "Start").to_csv(csv_name, index = False)
+    store.upsert(statement_row(period, new_row))
 
 
 def within_one_cent(val1, val2):
@@ -86,11 +100,11 @@ def sum_round_by_two(values):
         sum_val += round(values[i], 2)
     return round(sum_val, 2)
 
-def error_system_exit(error_type):
+def error_system_exit(error_type, status = None):
     print("-------------------------------------------------")
     print("Error: {}. Program quit".format(error_type))
     print("-------------------------------------------------")
-    sys.exit()
+    sys.exit(status)
 
 def warn(warning_statement):
     print("-------------------------------------------------")
@@ -108,6 +122,8 @@ def is_int(s):
                            "input: {} is integer".format(s)))
 
 def u_confirm(user_query):
+    if defer_prompts:
+        raise ReviewNeeded(user_query)
     return input("{} (y, n) ".format(user_query))
 
 def u_input_info(pdf_name, info_df, equity):
@@ -133,6 +149,8 @@ def u_input_info(pdf_name, info_df, equity):
 
 
 def u_input(query, return_type):
+    if defer_prompts:
+        raise ReviewNeeded(query)
     value = input("{} ".format(query))
     value = rem_char(value, [',', '$'])
     if return_type == "%Y-%m-%d":
@@ -164,19 +182,11 @@ def u_input_equity(pdf_name, equities, date, replace, index):
     book_cost = u_input("Book Cost: ", float)
     # if replacing row
     if replace:
-        equities.drop(index = index, inplace = True)
+        equities.remove_at(index)
     # add missing equity
-    ticker_row = pd.DataFrame({"date": [date],
-                               "ticker": [ticker], 
-                               "total_quantity": [total_quantity], 
-                               "market_price": [market_price], 
-                               "currency": [cur], 
-                               "market_value": [market_value], 
-                               "book_cost": [book_cost], 
-                               })
-    # update the entry of the equity
-    equities = update_df_row(pdf_name, [ticker], ["ticker"], ticker_row, equities)
-    equities.reset_index(drop = True, inplace = True)
+    add_record(pdf_name, equities, records.Equity(date, ticker, total_quantity, 
+                                                  market_price, cur, market_value, 
+                                                  book_cost))
     return equities
 
 def u_query(user_query_1, user_query_2, return_type):
@@ -223,19 +233,6 @@ def join_text_space(text, start, end):
         error_system_exit("Unexpected error when joining PDF"
                           " from indicies {} to {}".format(start, end))
 
-def cursor_at_phrase(text, index, phrase):
-    num_word = phrase.count(' ') + 1
-    num_char = len(phrase)
-    if num_word == 1:
-        if text[index][-num_char:] == phrase:
-            return True
-        else:
-            return False
-    else:
-        if join_text_space(text, index, index + num_word)[-num_char:] == phrase:
-            return True
-        return False
-
 def convert_to_date_time(pdf_name, period, date):
     try:
         date = pd.to_datetime(date, format='%Y-%m-%d').date()
@@ -262,19 +259,40 @@ def hacky_get_date(pdf_name, text, start_index, period):
     date = convert_to_date_time(pdf_name, period, date)
     return date, start_index + i
 
-def update_df_col_row(pdf_name, entry_col, new_entry, data_frame):
-    if np.isnan(data_frame.at[0, entry_col]):
-        data_frame.at[0, entry_col] = new_entry        
-        return data_frame 
+def update_cash_item(pdf_name, label, new_entry, cash_items):
+    if not cash_items.is_set(label):
+        cash_items[label] = new_entry
+        return cash_items
     # entry has already been written
     warn("Warning. PDF: {}\nAssignment of {} already exists:\n{}\n"
-         .format(pdf_name, entry_col, data_frame[entry_col][0]))
+         .format(pdf_name, label, cash_items[label]))
     user_response = u_confirm("Would you like to replace with:\n{}".format(new_entry))
     if user_response == "y":
-        data_frame.at[0, entry_col] = new_entry        
-        return data_frame 
+        cash_items[label] = new_entry
+        return cash_items
     elif user_response == "n":
-        return data_frame
+        return cash_items
+    else:
+        error_system_exit("Incorrect User Input: ({})".format(user_response))
+
+# records version of update_df_row, 'collection' is a records.Collection so the
+# duplicate (same key) is a dict lookup
+def add_record(pdf_name, collection, record):
+    duplicate = collection.get(record)
+    # there is no such record
+    if duplicate is None:
+        collection.put(record)
+        return collection
+    # there exists a record with this information already
+    warn("Warning. PDF: {}\nAssignment of {} in column {} already exists:\n{}\n"
+         .format(pdf_name, list(collection.key_of(record)), list(collection.key), 
+                 duplicate))
+    user_response = u_confirm("Would you like to replace with:\n{}\n".format(record))
+    if user_response == "y":
+        collection.put(record)
+        return collection
+    elif user_response == "n":
+        return collection
     else:
         error_system_exit("Incorrect User Input: ({})".format(user_response))
 
@@ -323,27 +341,17 @@ def found_date(pdf_name, text, index, num_word_name):
 
     return start, end
 
-# function for Cash Paid In and Cash Paid Out items
-def found_cash_paid_item(text, index, cash_df):
-    # grab the column headers of cash data frame
-    cash_cols = cash_df.columns
-    # iterate over the "Cash Paid -" information 
-    for col_item in cash_cols:
-        # if first word is not 'col' and second does not contain '$'
-        if not (cursor_at_phrase(text, index, col_item) and text[index+1][0] == "$"):
-            continue
-        # found the item and cash value corresponding to 'col'
-        item_val = float(rem_char(concat_before_find(text[index+1], '.', 3), [',', '$']))
-        # return 
-        return True, col_item, item_val
-    # did not find any instances of "Cash Paid -" items
-    return False, False, False
+# function for Cash Paid In and Cash Paid Out items, the cursor is at the item
+# (found by section_index.index_sections) and the next entry is its $ value
+def cash_item_value(text, index):
+    return float(rem_char(concat_before_find(text[index+1], '.', 3), [',', '$']))
 
     # sometimes there are issues with extra spaces
 def search_till_dot_before_cents(text, index, max_shift):
     shift = 0
     value = join_text_no_space(text, index, index+shift)
-    while (len(value) - value.find(".") != 3):
+    # a piece without a '.' is never a whole value, even "$2" of "$2 3.57"
+    while (value.find(".") < 0 or len(value) - value.find(".") != 3):
         if shift > max_shift:
             break
         shift += 1
@@ -393,240 +401,166 @@ def found_equity(text, index, date):
     if not is_int(rem_char(book_cost, ['.'])):
         return False, False
     book_cost = float(book_cost)
-    ticker_row = pd.DataFrame({"date": [date],
-                               "ticker": [ticker], 
-                               "total_quantity": [total_quantity], 
-                               "market_price": [market_price], 
-                               "currency": [cur], 
-                               "market_value": [market_value], 
-                               "book_cost": [book_cost], 
-                               })
     # found equity
-    return True, ticker_row
+    return True, records.Equity(date, ticker, total_quantity, market_price, cur, 
+                                market_value, book_cost)
+
+# for finding the first $ value in text[start:max_index], next_dollar[j] is the
+# index of the first entry from j onwards containing a $
+def found_dollar_value(text, start, max_index, next_dollar):
+    j = next_dollar[start]
+    while j < max_index:
+        value, _ = search_till_dot_before_cents(text, j, 3)
+        value = concat_before_find(value, '.', 3)
+        if is_int(rem_char(value, ['.'])):
+            return True, float(value), j
+        j = next_dollar[j+1]
+    return False, False, False
 
 # for finding activities
-def found_activity(pdf_name, text, index, max_index, transaction_types):
-    # for each type of transaction
-    for transaction in transaction_types:
-        pos_transaction = reduce_till_uppper(text[index])
-        if pos_transaction != transaction:
-            continue
-        # found transaction
-        # next entries should be "Charged"
-        for j in range(index+1, max_index):
-            # want to find an entry with a $
-            if text[j].find("$") < 0:
-                continue
-            charge, _ = search_till_dot_before_cents(text, j, 3)
-            charge = concat_before_find(charge, '.', 3)
-            if not is_int(rem_char(charge, ['.'])):
-                continue
-            charge = float(charge)
-            nindex = j
-            break
-        # if for loop was not broken
-        else:
-            continue
-        # next entries should be "Credit"
-        for j in range(nindex+1, max_index):
-            # want to find an entry with a $
-            if text[j].find("$") < 0:
-                continue
-            credit, _ = search_till_dot_before_cents(text, j, 3)
-            credit = concat_before_find(credit, '.', 3)
-            if not is_int(rem_char(credit, ['.'])):
-                continue
-            credit = float(credit)
-            return True, [transaction, float(credit) - float(charge)]
-
-        # failed to determine transaction information
-        warn("Warning. PDF: {}. Could not determine charge or credit of type: {}"
-             .format(pdf_name, transaction))
-        user_response = u_confirm("Does the following contain a transaction of this "
-                                  "type?{}\n".format(join_text_space(text, index-1, 
-                                                                     index + 10)))
-        if user_response == "y":
-            charge = u_input("What is the 'Charged' value? ", float)
-            credit = u_input("What is the 'Credit' value? ", float)
-            return True, [transaction, float(credit) - float(charge)]
-        elif user_response == "n":
-            return False, False
-        else:
-            error_system_exit("Incorrect User Input: ({})".format(user_response))
-    return False, False
-
-# function to whether there are np.nan in data frame
-def df_check(pdf_name, df, category):
-    # grab the column headers of data frame
-    cols = df.columns
-    # iterate over columns
-    for col in cols:
-        if not np.isnan(df.at[0, col]):
+def found_activity(pdf_name, text, index, max_index, transaction_types, next_dollar):
+    transaction = reduce_till_uppper(text[index])
+    if transaction not in transaction_types:
+        return False, False
+    # found transaction
+    # next entries should be "Charged"
+    found, charge, nindex = found_dollar_value(text, index+1, max_index, next_dollar)
+    if not found:
+        return False, False
+    # next entries should be "Credit"
+    found, credit, _ = found_dollar_value(text, nindex+1, max_index, next_dollar)
+    if found:
+        return True, records.Activity(transaction, float(credit) - float(charge))
+
+    # failed to determine transaction information
+    warn("Warning. PDF: {}. Could not determine charge or credit of type: {}"
+         .format(pdf_name, transaction))
+    user_response = u_confirm("Does the following contain a transaction of this "
+                              "type?{}\n".format(join_text_space(text, index-1, 
+                                                                 index + 10)))
+    if user_response == "y":
+        charge = u_input("What is the 'Charged' value? ", float)
+        credit = u_input("What is the 'Credit' value? ", float)
+        return True, records.Activity(transaction, float(credit) - float(charge))
+    elif user_response == "n":
+        return False, False
+    else:
+        error_system_exit("Incorrect User Input: ({})".format(user_response))
+
+# function to whether there are items that were not found
+def cash_check(pdf_name, cash_items, category):
+    # iterate over items
+    for label in cash_items.labels():
+        if cash_items.is_set(label):
             continue
         # nan was found
         warn("Warning. PDF: {}\nUnder {}, the item {} was not updated"
-             .format(pdf_name, category, col))
-        df.at[0, col] = u_input("Manually enter value: ", float)
-    return df
+             .format(pdf_name, category, label))
+        cash_items[label] = u_input("Manually enter value: ", float)
+    return cash_items
 
-def check_val(value_name, value, df, index, return_type):
+def check_val(value_name, value, cash_items, return_type):
     cor, nvalue = u_query("Is {} value: {} correct? ".format(value_name, value),
                          "What is {} value? ".format(value_name), return_type)
     if not cor:
-        df.at[index, value_name] = nvalue
-        return df, nvalue
-    return df, value
+        cash_items[value_name] = nvalue
+        return cash_items, nvalue
+    return cash_items, value
 
-def main(pdf_name, num_word_name):
+def parse_statement(pdf_name, num_word_name):
     print("Processing: {}".format(pdf_name))
-    # creating a pdf reader object 
-    reader = PdfReader(pdf_name)
-
-    # extract all text from pdf
-    text = str()
-    for page_index in range(len(reader.pages)):
-        # getting a specific page from the pdf file 
-        page = reader.pages[page_index] 
-        # extracting text from page 
-        text += page.extract_text() 
-    # split based on spaces
-    text = text.split()
-
+    # everything found is kept as records (see records.py), the data frames are
+    # built once at the end
     # start and end of current period
-    statement_period = pd.DataFrame(columns = ["Start", "End"])
+    statement_period = records.Collection(["Start", "End"])
 
     # interested in the following information under "Cash Paid In" Section
     # Note "Cash" and "Portfolio" (i.e. "Total Portfolio") are not in "Cash Paid In" 
     # Section but are stated prior to "Cash Paid Out" Section and therefore included here
-    cash_in = pd.DataFrame({"Cash": [np.nan], "Portfolio": [np.nan],
-                            "Deposits": [np.nan], "Dividends": [np.nan]})
+    cash_in = records.CashItems(["Cash", "Portfolio", "Deposits", "Dividends"])
 
     # interested in the following bits of information under "Cash Paid Out" Section
-    cash_out = pd.DataFrame({"Taxes": [np.nan], "Withdrawals": [np.nan]})     
-    cursor_after_cash_out = 0
+    cash_out = records.CashItems(["Taxes", "Withdrawals"])
 
-    # the range which portfolio equities should be found in
-    cursor_equity_range = [len(text), len(text)]
-    cursor_activity_range = [len(text), len(text)]
+    # equities, one per ticker
+    equities = records.Collection(["ticker"])
 
-    # equities
-    equities = pd.DataFrame(columns = ["date", "ticker", "total_quantity", "market_price", 
-                                       "currency", "market_value", "book_cost"])
-
-                                       #"region", "type", "sector"])
-    # current period
-    act_cur_period = pd.DataFrame({"DIV": [0], "CONT": [0], "DEP": [0], 
-                                   "WD": [0], "NRT": [0]}, dtype = np.float64)
+    # current period, summed per transaction type
+    act_cur_period = {"DIV": 0.0, "CONT": 0.0, "DEP": 0.0, "WD": 0.0, "NRT": 0.0}
 
     #--------------- SCANNING DOCUMENT --------------- 
-    # i is considered as cursor
-    for i in range(len(text)):
-
-        #--------------- ASSES WHERE CURSOR IS --------------- 
-        # cursor has not reached "Cash Paid Out" section in "Portfolio Cash"
-        if cursor_after_cash_out == 0:
-            # we want to grab the first instance of "Fees" which occurs
-            # directly after "Cash Paid Out" in "Portfolio Cash"
-            if cursor_at_phrase(text, i, "Fees"):
-                # note 'cursor_after_cash_out' is only updated once
-                cursor_after_cash_out = 1
-        # cursor has reached "Cash Paid Out" section in "Portfolio Cash"
-        else:
-            # have not determined beginning of "Portfolio Equities" section
-            if cursor_equity_range[0] == len(text):
-                # we want to grab the first instance of the "Portfolio Equities" section
-                if cursor_at_phrase(text, i, "Portfolio Equities Symbol Total"):
-                    # note 'cursor_equity_range[0]' is only updated once
-                    cursor_equity_range[0] = i
-            # previously found beginning of the "Portfolio Equities" section
-            else:
-                # have not determined beginning of "Activity - Current period" section
-                if cursor_activity_range[0] == len(text):
-                    # we want to grab the first instance of "Activity - Current period"
-                    if (cursor_at_phrase(text, i, "Activity - Previous period(s)") or 
-                        cursor_at_phrase(text, i, "Activity - Current period")):
-                        # this defines the end of the "Portfolio Equities" section
-                        # and the beginning of the "Activity - Current period" section
-                        # note these are only updated once
-                        cursor_equity_range[1] = i
-                        cursor_activity_range[0] = i
-                # previously found beginning of the "Activity - Current period" section
-                else:
-                    # have not determined end of "Activity - Current period" section
-                    if cursor_activity_range[1] == len(text):
-                        # want to grab first instance of the end of "Activity - Current 
-                        # period" section
-                        if cursor_at_phrase(text, i, "Transactions for Future "
-                                                      "Settlement"):
-                            # note this is updated only once
-                            cursor_activity_range[1] = i
-                        if cursor_at_phrase(text, i, "LEVERAGE DISCLOSURE"):
-                            # note this is updated only once
-                            cursor_activity_range[1] = i
-        #--------------- ASSES WHERE CURSOR IS --------------- 
-
-        #--------------- CURSOR PRIOR TO "CASH PAID OUT" --------------- 
-        if cursor_after_cash_out == 0:
-            # determine "Statement Period" dates
-            if join_text_space(text, i, i+1)[-16:] == "Statement Period":
-                # grab start and end dates
-                start, end = found_date(pdf_name, text, i, num_word_name)
-                # if successful, update the start and end dates of document
-                statement_period = update_df_row(pdf_name, [start, end],
-                                                 statement_period.columns, 
-                                                 pd.DataFrame({"Start": [start], 
-                                                               "End": [end]}),
-                                                 statement_period)
-            # check whether cursor is at any of the "Cash Paid In" items 
-            found_item, item, item_val = found_cash_paid_item(text, i, cash_in)
-            if found_item:
-                # update cash_in
-                cash_in = update_df_col_row(pdf_name, item, item_val, cash_in)
-        #--------------- CURSOR PRIOR TO "CASH PAID OUT" --------------- 
-
-        #--------------- CURSOR IN "CASH PAID OUT" --------------- 
-        elif cursor_after_cash_out and i < cursor_equity_range[0]:
-            # check whether cursor is at any of the "Cash Paid Out" items 
-            found_item, item, item_val = found_cash_paid_item(text, i, cash_out)
-            if found_item:
-                # update cash_out
-                cash_out = update_df_col_row(pdf_name, item, item_val, cash_out)
-        #--------------- CURSOR IN "CASH PAID OUT" --------------- 
-
-        #--------------- CURSOR IN "PORTFOLIO EQUITIES" --------------- 
-        elif i >= cursor_equity_range[0] and i < cursor_activity_range[0]:
-            # check whether cursor is at an equity
-            equity, ticker_row = found_equity(text, i, statement_period.at[0, "End"])
-            if equity:
-                # update the entry of the equity
-                equities = update_df_row(pdf_name, [text[i]], ["ticker"], ticker_row, 
-                                         equities)
-                equities.reset_index(drop = True, inplace = True)
-        #--------------- CURSOR IN "PORTFOLIO EQUITIES" --------------- 
-
-        #--------------- CURSOR IN "ACTIVITY - CURRENT PERIOD" --------------- 
-        elif i >= cursor_activity_range[0] and i < cursor_activity_range[1]:
-            # check whether cursor is at an activity
-            activity, transaction = found_activity(pdf_name, text, i, 
-                                                   cursor_activity_range[1],  
-                                                   act_cur_period.columns)
-            if activity:
-                act_cur_period.at[0, transaction[0]] += transaction[1]
-        #--------------- CURSOR IN "ACTIVITY - CURRENT PERIOD" --------------- 
+    profiling.phase("extract")
+    # extract the text one page at a time, split based on spaces, and find every
+    # section boundary and anchor phrase as the pages come in. no page is read
+    # after the "Activity - Current period" section has ended, and the PDF is
+    # only decoded if it has not been seen before (see token_cache.py)
+    scanner = section_index.SectionScanner(cash_in.labels() + cash_out.labels())
+    token_cache.load_tokens(pdf_name, scanner)
+    text = scanner.text
+
+    profiling.phase("section_scan")
+    # the cursor then only visits the tokens of interest (see section_index.py)
+    sections = scanner.sections()
+    cursor_cash_out = sections["cash_out"]
+    cursor_equity_range = sections["equities"]
+    cursor_activity_range = sections["activity"]
+
+    profiling.phase("parse")
+    #--------------- CURSOR PRIOR TO "CASH PAID OUT" --------------- 
+    # determine "Statement Period" dates
+    for i in sections["statement_period"]:
+        # grab start and end dates
+        start, end = found_date(pdf_name, text, i, num_word_name)
+        # if successful, update the start and end dates of document
+        add_record(pdf_name, statement_period, records.Period(start, end))
+    period_end = statement_period.first().End
+    #--------------- CURSOR PRIOR TO "CASH PAID OUT" --------------- 
+
+    #--------------- "CASH PAID IN" AND "CASH PAID OUT" --------------- 
+    for i, item in sections["cash_items"]:
+        # "Cash Paid In" items are prior to "Cash Paid Out"
+        if i < cursor_cash_out and item in cash_in:
+            update_cash_item(pdf_name, item, cash_item_value(text, i), cash_in)
+        # "Cash Paid Out" items are prior to "Portfolio Equities"
+        elif (i >= cursor_cash_out and i < cursor_equity_range[0] and 
+              item in cash_out):
+            update_cash_item(pdf_name, item, cash_item_value(text, i), cash_out)
+    #--------------- "CASH PAID IN" AND "CASH PAID OUT" --------------- 
+
+    #--------------- CURSOR IN "PORTFOLIO EQUITIES" --------------- 
+    for i in range(cursor_equity_range[0], cursor_equity_range[1]):
+        # check whether cursor is at an equity
+        equity, ticker_row = found_equity(text, i, period_end)
+        if equity:
+            # update the entry of the equity
+            add_record(pdf_name, equities, ticker_row)
+    #--------------- CURSOR IN "PORTFOLIO EQUITIES" --------------- 
+
+    #--------------- CURSOR IN "ACTIVITY - CURRENT PERIOD" --------------- 
+    for i in range(cursor_activity_range[0], cursor_activity_range[1]):
+        # check whether cursor is at an activity
+        activity, transaction = found_activity(pdf_name, text, i, 
+                                               cursor_activity_range[1],  
+                                               act_cur_period,
+                                               sections["next_dollar"])
+        if activity:
+            act_cur_period[transaction.transaction] += transaction.amount
+    #--------------- CURSOR IN "ACTIVITY - CURRENT PERIOD" --------------- 
     #--------------- SCANNING DOCUMENT --------------- 
 
     #--------------- ASSESSING RESULTS --------------- 
+    profiling.phase("reconcile")
     # statement_period dates has been determined
 
     # cash_in and cash_out data check
-    cash_in.rename(columns = {'Portfolio':'Total Portfolio'}, inplace = True) 
-    df_check(pdf_name, cash_in, "Cash Paid In")
-    df_check(pdf_name, cash_out, "Cash Paid Out")
+    cash_in.rename('Portfolio', 'Total Portfolio')
+    cash_check(pdf_name, cash_in, "Cash Paid In")
+    cash_check(pdf_name, cash_out, "Cash Paid Out")
 
     # equities
-    equities_value = sum_round_by_two(equities["market_value"].values)
-    cash = cash_in.at[0, "Cash"]
-    total_port = cash_in.at[0, "Total Portfolio"]
+    equities_value = sum_round_by_two([equity.market_value for equity in equities])
+    cash = cash_in["Cash"]
+    total_port = cash_in["Total Portfolio"]
 
     while (not within_one_cent(round(equities_value + cash, 2), round(total_port, 2))):
         # things did not add up
@@ -634,9 +568,9 @@ def main(pdf_name, num_word_name):
              .format(round(equities_value, 2), round(cash, 2),
                      round(equities_value + cash, 2), round(total_port, 2)))
         # check cash value
-        cash_in, cash = check_val("Cash", cash, cash_in, 0, float)
+        cash_in, cash = check_val("Cash", cash, cash_in, float)
         # check total portfolio value
-        cash_in, total_port = check_val("Total Portfolio", total_port, cash_in, 0, float)
+        cash_in, total_port = check_val("Total Portfolio", total_port, cash_in, float)
         user_response = u_confirm("Is Portfolio Equities value: {} correct?"
                                   .format(round(equities_value, 2)))
         if user_response == "y":
@@ -645,7 +579,7 @@ def main(pdf_name, num_word_name):
             break
         # check equities
         correct, num_missing = u_query("{}\nAre all portfolio equities identified?"
-                                       .format(equities),
+                                       .format(equities.to_frame(EQUITY_COLUMNS)),
                                        "How many are missing? ", int)
         # there are missing equities
         if not correct:
@@ -653,17 +587,17 @@ def main(pdf_name, num_word_name):
             # for each missing equity
             for i in range(num_missing):
                 print("Missing Equity {}:".format(i))
-                equities = u_input_equity(pdf_name, equities, 
-                                          statement_period.at[0, "End"], False, False)
-                equities_value = sum_round_by_two(equities["market_value"].values)
+                equities = u_input_equity(pdf_name, equities, period_end, False, False)
+                equities_value = sum_round_by_two([equity.market_value 
+                                                   for equity in equities])
         else:
             correct = u_query("Is there a ticker with incorrect data?", False, False)
             # update incorrect data
             if correct:
                 index = u_input("Which ticker index?", int)
-                equities = u_input_equity(pdf_name, equities, 
-                                          statement_period.at[0, "End"], True, index)
-                equities_value = sum_round_by_two(equities["market_value"].values)
+                equities = u_input_equity(pdf_name, equities, period_end, True, index)
+                equities_value = sum_round_by_two([equity.market_value 
+                                                   for equity in equities])
             else:
                 # failed to find issue
                 proceed = u_confirm("Failed to find issue, proceed with data as is?")
@@ -673,8 +607,8 @@ def main(pdf_name, num_word_name):
                     error_system_exit("Sorry, input data manually")
     # current period
     # dividends
-    div_statement = round(cash_in.at[0, "Dividends"], 2) 
-    div_summed = round(act_cur_period.at[0, "DIV"], 2)
+    div_statement = round(cash_in["Dividends"], 2) 
+    div_summed = round(act_cur_period["DIV"], 2)
     if div_statement != div_summed:
         warn("Dividend value in 'Cash Paid In' section is {}. This differs to that of "
              "summed dividends (DIV) = {} in 'Activity - Current period' section"
@@ -683,10 +617,10 @@ def main(pdf_name, num_word_name):
                                          .format(div_statement),
                                          "Update Dividends value: ", float)
         if not correct:
-            cash_in.at[0, "Dividends"] = div_statement
+            cash_in["Dividends"] = div_statement
     # Taxes
-    taxes = round(cash_out.at[0, "Taxes"], 2) 
-    taxes_summed = -round(act_cur_period.at[0, "NRT"], 2)
+    taxes = round(cash_out["Taxes"], 2) 
+    taxes_summed = -round(act_cur_period["NRT"], 2)
     if taxes != taxes_summed:
         warn("Taxes value in 'Cash Paid Out' section is {}. This differs to that of "
              "summed taxes (NRT) = {} in 'Activity - Current period' section"
@@ -694,12 +628,12 @@ def main(pdf_name, num_word_name):
         correct, taxes = u_query("Is {} the correct Tax value?".format(taxes),
                                  "Update Tax value: ", float)
         if not correct:
-            cash_out.at[0, "Taxes"] = taxes
+            cash_out["Taxes"] = taxes
 
     # deposits
-    deposits = round(cash_in.at[0, "Deposits"], 2) 
-    deposits_summed = round(act_cur_period.at[0, "CONT"], 2)
-    deposits_summed += round(act_cur_period.at[0, "DEP"], 2)
+    deposits = round(cash_in["Deposits"], 2) 
+    deposits_summed = round(act_cur_period["CONT"], 2)
+    deposits_summed += round(act_cur_period["DEP"], 2)
     if deposits != deposits_summed:
         warn("Deposit value in 'Cash Paid In' section is {}. This differs to that of "
              "summed contributions (CONT/DEP) = {} in 'Activity - Current period' section"
@@ -707,11 +641,11 @@ def main(pdf_name, num_word_name):
         correct, deposits = u_query("Is {} the correct Deposit value?".format(deposits),
                                     "Update Depost value: ", float)
         if not correct:
-            cash_in.at[0, "Deposits"] = deposits
+            cash_in["Deposits"] = deposits
 
     # withdrawals
-    withdraw = round(cash_out.at[0, "Withdrawals"], 2) 
-    withdraw_summed = round(act_cur_period.at[0, "WD"], 2)
+    withdraw = round(cash_out["Withdrawals"], 2) 
+    withdraw_summed = round(act_cur_period["WD"], 2)
     if withdraw != withdraw_summed:
         warn("Withdrawals value in 'Cash Paid out' section is {}. This differs to that of "
              "summed withdrawals (WD) = {} in 'Activity - Current period' section"
@@ -719,17 +653,44 @@ def main(pdf_name, num_word_name):
         correct, withdraw = u_query("Is {} the correct Withdrawal value?"
                                     .format(withdraw), "Update withdrawals value: ", float)
         if not correct:
-            cash_in.at[0, "Withdrawals"] = withdraw
+            cash_out["Withdrawals"] = withdraw
     #--------------- ASSESSING RESULTS --------------- 
+    statement_period = statement_period.to_frame(["Start", "End"])
+    cash_in = cash_in.to_frame()
+    cash_out = cash_out.to_frame()
+    equities = equities.to_frame(EQUITY_COLUMNS)
+    profiling.phase(None)
+
+    return statement_period, cash_in, cash_out, equities
 
+def write_statement(pdf_name, statement_period, cash_in, cash_out, equities):
     #--------------- OUTPUT STATEMENT DATA RESULTS --------------- 
-    update_csv(statement_period, cash_in,"data/cash_paid_in.csv")
+    profiling.phase("output")
+    # read before the ledgers change, see summary_snapshot.update
+    snapshot = summary_snapshot.load()
 
-    update_csv(statement_period, cash_out,"data/cash_paid_out.csv")
+    update_ledger(statement_period, cash_in, "cash_paid_in")
+
+    update_ledger(statement_period, cash_out, "cash_paid_out")
 
     equities = check_info_equities(pdf_name, statement_period, equities)
-    update_csv_equity(statement_period.at[0, "End"].strftime('%Y-%m-%d'), equities, 
-                      "data/holdings.csv")
+    update_ledger_equity(statement_period.at[0, "End"].strftime('%Y-%m-%d'), equities, 
+                         "holdings")
+
+    summary_snapshot.update(snapshot, [(statement_row(statement_period, cash_in).iloc[0],
+                                        cash_out.iloc[0], equities)])
+    profiling.phase(None)
     #--------------- OUTPUT STATEMENT DATA RESULTS --------------- 
 
-main(sys.argv[1], int(sys.argv[2]))
+def main(pdf_name, num_word_name):
+    statement_period, cash_in, cash_out, equities = parse_statement(pdf_name, 
+                                                                    num_word_name)
+    write_statement(pdf_name, statement_period, cash_in, cash_out, equities)
+
+if __name__ == "__main__":
+    # --profile prints per phase timings and call counts as JSON at the end
+    if "--profile" in sys.argv:
+        profiling.enable()
+    main(sys.argv[1], int(sys.argv[2]))
+    if "--profile" in sys.argv:
+        profiling.print_report()
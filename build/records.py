@@ -0,0 +1,115 @@
+import math
+import pandas as pd
+
+
+# Plain records for what read_pdf.py finds while parsing a statement. Matches
+# are kept as slotted objects, DataFrames are only built once parsing is done.
+# Field names are the column names of the DataFrames they end up in.
+
+
+class Record:
+    __slots__ = ()
+
+    def values(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __str__(self):
+        # one "field value" line each, as a one-row DataFrame transposed
+        return "\n".join("{:<16}{}".format(name, getattr(self, name))
+                         for name in self.__slots__)
+
+class Period(Record):
+    __slots__ = ("Start", "End")
+
+    def __init__(self, start, end):
+        self.Start = start
+        self.End = end
+
+class Equity(Record):
+    __slots__ = ("date", "ticker", "total_quantity", "market_price", "currency",
+                 "market_value", "book_cost")
+
+    def __init__(self, date, ticker, total_quantity, market_price, currency,
+                 market_value, book_cost):
+        self.date = date
+        self.ticker = ticker
+        self.total_quantity = total_quantity
+        self.market_price = market_price
+        self.currency = currency
+        self.market_value = market_value
+        self.book_cost = book_cost
+
+class Activity(Record):
+    # a transaction in "Activity - Current period", amount is credit - charge
+    __slots__ = ("transaction", "amount")
+
+    def __init__(self, transaction, amount):
+        self.transaction = transaction
+        self.amount = amount
+
+
+class CashItems:
+    # the labelled $ values of one section ("Cash Paid In", "Cash Paid Out"),
+    # NaN until found
+    __slots__ = ("items",)
+
+    def __init__(self, labels):
+        self.items = dict.fromkeys(labels, math.nan)
+
+    def __getitem__(self, label):
+        return self.items[label]
+
+    def __setitem__(self, label, value):
+        self.items[label] = value
+
+    def __contains__(self, label):
+        return label in self.items
+
+    def labels(self):
+        return list(self.items)
+
+    def is_set(self, label):
+        return not math.isnan(self.items[label])
+
+    def rename(self, label, new_label):
+        self.items = {new_label if k == label else k: v for k, v in self.items.items()}
+
+    def to_frame(self):
+        return pd.DataFrame({label: [value] for label, value in self.items.items()})
+
+
+class Collection:
+    # records in the order they were added, keyed on 'key' (field names) so a
+    # duplicate is found in O(1). a replaced record moves to the end
+    __slots__ = ("key", "records")
+
+    def __init__(self, key):
+        self.key = key
+        self.records = {}
+
+    def key_of(self, record):
+        return tuple(getattr(record, name) for name in self.key)
+
+    def get(self, record):
+        # the record with the same key as 'record', None if there is none
+        return self.records.get(self.key_of(record))
+
+    def put(self, record):
+        key = self.key_of(record)
+        self.records.pop(key, None)
+        self.records[key] = record
+
+    def remove_at(self, index):
+        del self.records[list(self.records)[index]]
+
+    def first(self):
+        return next(iter(self.records.values()))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def to_frame(self, columns):
+        return pd.DataFrame([record.values() for record in self], columns = columns)
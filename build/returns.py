@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+
+# annual compounded rates of return are searched for within these bounds
+RATE_BOUNDS = (-0.99, 10.0)
+# number of statements in a rolling window (12 monthly statements = 1 year)
+ROLLING_WINDOW = 12
+# shorter histories are not annualized, a few months compounded to a full
+# year say nothing. just under a year so 12 monthly statements (Jan 1 to
+# Dec 31 is 364 days) still are
+MIN_ANNUALIZED_YEARS = 0.99
+
+
+def statement_flows(cash_in_df, cash_out_df):
+    # one row per statement period: portfolio value at 'End' plus the deposits and
+    # withdrawals made during the period. as in the rest of the summary, money
+    # is taken to move on the 'Start' of the statement period
+    flows = pd.merge(cash_in_df[["Start", "End", "Total Portfolio", "Deposits"]],
+                     cash_out_df[["Start", "End", "Withdrawals"]],
+                     on = ["Start", "End"], how = "left")
+    flows["Withdrawals"] = flows["Withdrawals"].fillna(0)
+    flows["Start"] = pd.to_datetime(flows["Start"])
+    flows["End"] = pd.to_datetime(flows["End"])
+    flows.sort_values(by = "End", inplace = True)
+    flows.reset_index(drop = True, inplace = True)
+    return flows
+
+def years(start, end):
+    return (end - start)/np.timedelta64(1, "D")/365
+
+def solve_rates(flows, years_invested, value, max_iter = 100, tol = 1e-10):
+    # for every row i, solves for the annual compounded rate r_i such that
+    #   sum_j flows[i, j]*(1 + r_i)**years_invested[i, j] = value[i]
+    # i.e. each flow (deposits positive, withdrawals negative) compounded until
+    # the end date adds up to the value of the portfolio. all rows are solved
+    # at once with Newton's method (analytic derivative), falling back to
+    # bisection whenever a step leaves the bracket around the root. rows
+    # without a root in RATE_BOUNDS are NaN. unused entries are flows of 0
+    flows = np.atleast_2d(np.asarray(flows, dtype = np.float64))
+    years_invested = np.atleast_2d(np.asarray(years_invested, dtype = np.float64))
+    value = np.atleast_1d(np.asarray(value, dtype = np.float64))
+
+    def objective(rate):
+        growth = (1 + rate)[:, None]**years_invested
+        f = (flows*growth).sum(axis = 1) - value
+        fprime = (flows*years_invested*growth).sum(axis = 1)/(1 + rate)
+        return f, fprime
+
+    lo = np.full(len(value), RATE_BOUNDS[0])
+    hi = np.full(len(value), RATE_BOUNDS[1])
+    f_lo, _ = objective(lo)
+    f_hi, _ = objective(hi)
+    valid = np.sign(f_lo)*np.sign(f_hi) <= 0
+
+    rate = np.full(len(value), 0.05)
+    with np.errstate(divide = "ignore", invalid = "ignore", over = "ignore"):
+        for _ in range(max_iter):
+            f, fprime = objective(rate)
+            # keep the root bracketed by [lo, hi]
+            below = np.sign(f) == np.sign(f_lo)
+            lo = np.where(below, rate, lo)
+            f_lo = np.where(below, f, f_lo)
+            hi = np.where(below, hi, rate)
+            new_rate = rate - f/fprime
+            bisect = ~np.isfinite(new_rate) | (new_rate <= lo) | (new_rate >= hi)
+            new_rate = np.where(bisect, (lo + hi)/2, new_rate)
+            new_rate = np.where(f == 0, rate, new_rate)
+            converged = np.abs(new_rate - rate) < tol
+            rate = new_rate
+            if np.all(converged | ~valid):
+                break
+    return np.where(valid, rate, np.nan)
+
+def money_weighted_return(flows):
+    # compounded rate (IRR) with every deposit and withdrawal dated at the start
+    # of its statement period, over the whole history and annualized. as for
+    # time_weighted_return, less than a year of history is not annualized: the
+    # rate is then solved for over the history itself, so a good month is not
+    # compounded out of RATE_BOUNDS
+    end = flows["End"].values[-1]
+    span = years(flows["Start"].values[0], end)
+    years_invested = years(flows["Start"].values, end)
+    net = (flows["Deposits"] - flows["Withdrawals"]).values
+    value = flows["Total Portfolio"].values[-1]
+    if span < MIN_ANNUALIZED_YEARS:
+        return solve_rates(net, years_invested/span, value)[0], np.nan
+    annual = solve_rates(net, years_invested, value)[0]
+    return (1 + annual)**span - 1, annual
+
+def period_returns(flows):
+    # return of each statement period, with the period's deposits/withdrawals
+    # added to the portfolio value at the start of the period
+    value = flows["Total Portfolio"].values
+    start_value = np.concatenate([[0], value[:-1]])
+    invested = start_value + flows["Deposits"].values - flows["Withdrawals"].values
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        return np.where(invested > 0, value/invested - 1, 0)
+
+def time_weighted_return(flows):
+    # period returns chained over the whole history, and annualized (NaN for
+    # less than a year of history)
+    total = np.prod(1 + period_returns(flows)) - 1
+    span = years(flows["Start"].values[0], flows["End"].values[-1])
+    if span < MIN_ANNUALIZED_YEARS:
+        return total, np.nan
+    return total, (1 + total)**(1/span) - 1
+
+def rolling_returns(flows, window = ROLLING_WINDOW):
+    # annualized time weighted and money weighted returns over every run of
+    # 'window' consecutive statements, computed for all windows at once
+    n = len(flows)
+    per_period = period_returns(flows)
+    result = pd.DataFrame({"End": flows["End"], "Period Return": per_period,
+                           "Rolling TWR": np.nan, "Rolling IRR": np.nan})
+    if n < window:
+        return result
+
+    start = flows["Start"].values
+    end = flows["End"].values
+    value = flows["Total Portfolio"].values
+    net = (flows["Deposits"] - flows["Withdrawals"]).values
+    # window i covers statements first[i] .. last[i]
+    last = np.arange(window - 1, n)
+    first = last - window + 1
+    span = years(start[first], end[last])
+
+    # time weighted: chained period returns via cumulative log growth
+    log_growth = np.concatenate([[0], np.cumsum(np.log1p(per_period))])
+    twr = np.exp(log_growth[last + 1] - log_growth[first]) - 1
+    result.loc[last, "Rolling TWR"] = (1 + twr)**(1/span) - 1
+
+    # money weighted: the portfolio value before the window is treated as a
+    # deposit at its start, followed by the deposits/withdrawals of the window
+    idx = first[:, None] + np.arange(window)[None, :]
+    opening = np.where(first > 0, value[np.maximum(first - 1, 0)], 0)
+    window_flows = np.column_stack([opening, net[idx]])
+    window_years = np.column_stack([span, years(start[idx], end[last][:, None])])
+    result.loc[last, "Rolling IRR"] = solve_rates(window_flows, window_years, value[last])
+    return result
@@ -0,0 +1,143 @@
+import bisect
+
+
+# Single pass indexer for the section boundaries and anchor phrases that
+# read_pdf.main used to probe for at every token.
+#
+# Pages can be fed as they are extracted (SectionScanner), nothing after the
+# end of the activity section is ever needed.
+#
+# Anchors are matched on the token holding their last word, which is looked
+# up in a dict (multi word phrases) or by its suffix (single word phrases), so
+# each token costs a constant amount of work no matter how many anchors there
+# are. Cursor positions follow read_pdf.cursor_at_phrase: a single word phrase
+# is at the cursor token, a multi word phrase occupies the tokens after it.
+
+
+# (name, phrase, shift), the cursor is 'shift' tokens before the last word
+ANCHORS = [("cash_out", "Fees", 0),
+           ("equities", "Portfolio Equities Symbol Total", 4),
+           ("activity", "Activity - Previous period(s)", 4),
+           ("activity", "Activity - Current period", 4),
+           ("activity_end", "Transactions for Future Settlement", 4),
+           ("activity_end", "LEVERAGE DISCLOSURE", 2),
+           # checked as join_text_space(text, i, i+1)[-16:] in read_pdf
+           ("statement_period", "Statement Period", 1)]
+# tokens after the end of the activity section that read_pdf may still look at
+# (search_till_dot_before_cents, the found_activity prompt)
+LOOKAHEAD = 16
+
+
+def build_matcher(anchors, labels):
+    # single word phrases (and cash labels) keyed by length then suffix,
+    # multi word phrases keyed by their last word
+    suffixes = {}
+    last_words = {}
+    for name, phrase, shift in anchors:
+        words = phrase.split(" ")
+        if len(words) == 1:
+            suffixes.setdefault(len(phrase), {})[phrase] = (name, shift)
+        else:
+            last_words.setdefault(words[-1], []).append((name, words, shift))
+    for label in labels:
+        suffixes.setdefault(len(label), {}).setdefault(label, ("cash_item", 0))
+    return suffixes, last_words
+
+def match_token(text, k, suffixes, last_words):
+    # yields (name, cursor, phrase) for every anchor ending at token k
+    token = text[k]
+    for length, phrases in suffixes.items():
+        phrase = token[-length:]
+        if phrase in phrases:
+            name, shift = phrases[phrase]
+            yield name, k - shift, phrase
+    for name, words, shift in last_words.get(token, []):
+        first = k - len(words) + 1
+        if first < 0:
+            continue
+        if not text[first].endswith(words[0]):
+            continue
+        if all(text[first + w] == words[w] for w in range(1, len(words) - 1)):
+            yield name, k - shift, " ".join(words)
+
+def first_after(cursors, cursor, n):
+    # first cursor strictly after 'cursor', n if there is none
+    j = bisect.bisect_right(cursors, cursor)
+    return cursors[j] if j < len(cursors) else n
+
+class SectionScanner:
+    # index_sections fed one page of tokens at a time (see token_cache.load_tokens),
+    # closed() tells when the remaining pages can no longer change the result
+    def __init__(self, labels):
+        self.suffixes, self.last_words = build_matcher(ANCHORS, labels)
+        self.reset()
+
+    def reset(self):
+        # back to nothing fed
+        self.text = []
+        self.cursors = {name: [] for name, _, _ in ANCHORS}
+        # the $ value of a cash item is the token after it, which may not have
+        # been fed yet, so they are checked in sections()
+        self.cash_items = []
+
+    def feed(self, tokens):
+        start = len(self.text)
+        self.text += tokens
+        for k in range(start, len(self.text)):
+            for name, i, phrase in match_token(self.text, k, self.suffixes,
+                                               self.last_words):
+                if i < 0:
+                    continue
+                if name == "cash_item":
+                    self.cash_items.append((i, phrase))
+                else:
+                    # matches are produced in order of the phrase's last token,
+                    # which is not always the order of the cursors
+                    bisect.insort(self.cursors[name], i)
+
+    def boundaries(self):
+        # the sections are found in order, each one being the first instance
+        # after the start of the previous one (len(text) when not found yet)
+        n = len(self.text)
+        cash_out = first_after(self.cursors["cash_out"], -1, n)
+        equities_start = first_after(self.cursors["equities"], cash_out, n)
+        activity_start = first_after(self.cursors["activity"], equities_start, n)
+        activity_end = first_after(self.cursors["activity_end"], activity_start, n)
+        return cash_out, equities_start, activity_start, activity_end
+
+    def closed(self):
+        # anchors matched from here on have cursors well past the end of the
+        # activity section, so none of the boundaries can move
+        return self.boundaries()[3] + LOOKAHEAD < len(self.text)
+
+    def sections(self):
+        # returns the section map used by read_pdf.main
+        #   statement_period: cursors at "Statement Period" before "Cash Paid Out"
+        #   cash_items      : (cursor, label) for each label followed by a $ value
+        #   cash_out        : cursor at the first "Fees" (start of "Cash Paid Out")
+        #   equities        : [start, end) of the "Portfolio Equities" section
+        #   activity        : [start, end) of the "Activity - Current period" section
+        #   next_dollar     : index of the next token containing a $ (activity only)
+        text = self.text
+        n = len(text)
+        cash_out, equities_start, activity_start, activity_end = self.boundaries()
+        cash_items = sorted((i, phrase) for i, phrase in self.cash_items
+                            if i + 1 < n and text[i+1][:1] == "$")
+
+        next_dollar = [activity_end]*(n + 1)
+        for j in range(activity_end - 1, activity_start - 1, -1):
+            next_dollar[j] = j if text[j].find("$") >= 0 else next_dollar[j+1]
+
+        return {"statement_period": [i for i in self.cursors["statement_period"]
+                                     if i < cash_out],
+                "cash_items": cash_items,
+                "cash_out": cash_out,
+                "equities": [equities_start, activity_start],
+                "activity": [activity_start, activity_end],
+                "next_dollar": next_dollar}
+
+def index_sections(text, labels):
+    # the section map of an already extracted token list
+    scanner = SectionScanner(labels)
+    scanner.feed(text)
+    return scanner.sections()
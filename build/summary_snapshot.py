@@ -0,0 +1,172 @@
+import os
+import json
+import target_allocation
+
+
+# data/summary.json holds everything make_summary.py reports, so a summary is a
+# single small read instead of a pass over every ledger:
+#   statements: values of every statement, with running sums ("Cumulative ...")
+#   latest:     the most recent statement, its holdings and region/type/sector
+#               totals
+#   returns:    money/time weighted returns and the rolling returns table
+#   target:     the target allocation (data/target_allocation.csv)
+# read_pdf.py and batch_read.py append each new statement as it is written to
+# the ledgers. Anything else (a replaced or older statement, a ledger changed
+# by hand or by ledger.py, or a new target) rebuilds it on the next run.
+# pandas is only imported when the snapshot is written.
+#   python build/summary_snapshot.py   rebuild from the ledgers
+
+SNAPSHOT = "data/summary.json"
+# bumped whenever what is stored changes, older snapshots are then rebuilt
+VERSION = 4
+STATEMENT_COLUMNS = ["Start", "End", "Cash", "Total Portfolio", "Deposits",
+                     "Dividends", "Taxes", "Withdrawals"]
+# columns with a running sum
+SUMMED = ["Deposits", "Withdrawals", "Dividends", "Taxes"]
+HOLDING_COLUMNS = ["ticker", "total_quantity", "market_value", "book_cost",
+                   "region", "type", "sector"]
+HOLDING_TEXT = ["ticker", "region", "type", "sector"]
+
+
+def source_files():
+    # the ledgers the snapshot is built from (see ledger.py) and the target
+    if os.environ.get("WS_LEDGER", "csv") == "sqlite":
+        return [os.path.join("data", "ledger.db"), target_allocation.TARGET_FILE]
+    return [os.path.join("data", table + ".csv")
+            for table in ["cash_paid_in", "cash_paid_out", "holdings"]] + [
+            target_allocation.TARGET_FILE]
+
+def ledger_stamp():
+    # changes whenever a ledger or the target is written
+    stamp = {}
+    for path in source_files():
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamp[path] = [stat.st_mtime_ns, stat.st_size]
+    return stamp
+
+def number(value):
+    # NaN is not valid JSON
+    value = float(value)
+    return None if value != value else value
+
+def text(value):
+    return None if value != value else str(value)
+
+def load():
+    # None when there is no snapshot or it is out of date with the ledgers
+    if not os.path.exists(SNAPSHOT):
+        return None
+    with open(SNAPSHOT) as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != VERSION or snapshot.get("stamp") != ledger_stamp():
+        return None
+    return snapshot
+
+def save(snapshot):
+    snapshot["version"] = VERSION
+    snapshot["stamp"] = ledger_stamp()
+    tmp_path = SNAPSHOT + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, SNAPSHOT)
+    return snapshot
+
+def statement_entry(row, previous):
+    # row holds STATEMENT_COLUMNS, previous is the entry of the statement before
+    entry = {"Start": text(row["Start"]), "End": text(row["End"])}
+    for col in STATEMENT_COLUMNS[2:]:
+        entry[col] = number(row[col])
+    for col in SUMMED:
+        before = 0.0 if previous is None else previous["Cumulative " + col]
+        entry["Cumulative " + col] = before + (entry[col] or 0.0)
+    return entry
+
+def latest_entry(entry, holdings_df):
+    holdings = []
+    for holding in holdings_df[HOLDING_COLUMNS].to_dict("records"):
+        holdings.append({col: text(value) if col in HOLDING_TEXT else number(value)
+                         for col, value in holding.items()})
+    latest = {"Start": entry["Start"], "End": entry["End"], "Cash": entry["Cash"],
+              "Total Portfolio": entry["Total Portfolio"], "holdings": holdings}
+    # market value per region, type and sector (holdings without one are left out)
+    for col in target_allocation.ATTRIBUTES:
+        totals = {}
+        for holding in holdings:
+            if holding[col] is not None:
+                totals[holding[col]] = (totals.get(holding[col], 0.0)
+                                        + (holding["market_value"] or 0.0))
+        latest[col] = totals
+    return latest
+
+def refresh(snapshot):
+    # returns need the whole history, they are recomputed from the snapshot's own
+    # statements (one row each) rather than from the ledgers
+    import pandas as pd
+    import returns
+    snapshot["target"] = target_allocation.read_target()
+    snapshot["returns"] = None
+    if len(snapshot["statements"]) == 0:
+        return
+    df = pd.DataFrame(snapshot["statements"])
+    flows = returns.statement_flows(df, df)
+    twr, twr_annual = returns.time_weighted_return(flows)
+    mwr, mwr_annual = returns.money_weighted_return(flows)
+    rolling_df = returns.rolling_returns(flows)
+    rolling_df["End"] = rolling_df["End"].dt.strftime('%Y-%m-%d')
+    snapshot["returns"] = {
+        "money_weighted": number(mwr), "money_weighted_annual": number(mwr_annual),
+        "time_weighted": number(twr), "time_weighted_annual": number(twr_annual),
+        "window": returns.ROLLING_WINDOW,
+        "rolling": [{col: value if col == "End" else number(value)
+                     for col, value in row.items()}
+                    for row in rolling_df.to_dict("records")]}
+
+def rebuild():
+    import pandas as pd
+    import ledger
+    cash_in_df = ledger.open_ledger("cash_paid_in").read()
+    cash_out_df = ledger.open_ledger("cash_paid_out").read()
+    statements_df = pd.merge(cash_in_df, cash_out_df, on = ["Start", "End"], how = "left")
+    statements_df.sort_values(by = "End", inplace = True)
+
+    snapshot = {"statements": [], "latest": None}
+    previous = None
+    for row in statements_df.to_dict("records"):
+        previous = statement_entry(row, previous)
+        snapshot["statements"].append(previous)
+    if previous is not None:
+        holdings_df = ledger.open_ledger("holdings").select(where = {"date": previous["End"]})
+        snapshot["latest"] = latest_entry(previous, holdings_df)
+    refresh(snapshot)
+    return save(snapshot)
+
+def update(snapshot, statements):
+    # called once the ledgers have been written. 'snapshot' is what load()
+    # returned before writing, 'statements' is a list of
+    # (cash paid in row, cash paid out row, holdings_df) just written.
+    # statements after the last one in the snapshot are appended to it, in any
+    # other case it is rebuilt from the ledgers
+    statements = sorted(statements, key = lambda statement: str(statement[0]["End"]))
+    if snapshot is None:
+        return rebuild()
+    for cash_in_row, cash_out_row, holdings_df in statements:
+        entries = snapshot["statements"]
+        if len(entries) != 0 and str(cash_in_row["End"]) <= entries[-1]["End"]:
+            return rebuild()
+        row = dict(cash_in_row)
+        row.update(cash_out_row)
+        entries.append(statement_entry(row, entries[-1] if len(entries) != 0 else None))
+        snapshot["latest"] = latest_entry(entries[-1], holdings_df)
+    refresh(snapshot)
+    return save(snapshot)
+
+def current():
+    snapshot = load()
+    if snapshot is None:
+        snapshot = rebuild()
+    return snapshot
+
+if __name__ == "__main__":
+    snapshot = rebuild()
+    print("Wrote {} ({} statements)".format(SNAPSHOT, len(snapshot["statements"])))
@@ -0,0 +1,170 @@
+import os
+import sys
+import random
+import datetime
+
+
+# Writes Wealthsimple style statement PDFs with made up holdings and activity,
+# for benchmarking read_pdf.py without real statements. The numbers reconcile
+# (equities + cash = Total Portfolio, DIV/NRT/CONT sums match "Cash Paid In/Out")
+# so a generated statement parses without any prompts. Some dates and dollar
+# values are split over two words, as PyPDF2 sometimes does with real
+# statements (see hacky_get_date and search_till_dot_before_cents).
+
+LINES_PER_PAGE = 60
+OWNER = "Jane Q Public"
+
+
+def pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    # minimal PDF: one Helvetica text block per page, one line per T*
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        content = "BT /F1 8 Tf 11 TL 30 770 Td\n" + "\n".join(
+                  "({}) Tj T*".format(pdf_escape(line)) for line in lines) + "\nET"
+        objects.append("<< /Length {} >>\nstream\n{}\nendstream".format(
+                       len(content.encode("latin-1")), content))
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       "/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>"
+                       .format(len(objects)))
+        kids.append("{} 0 R".format(len(objects)))
+    objects[1] = "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(kids),
+                                                                  len(kids))
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for num, obj in enumerate(objects, start = 1):
+        offsets.append(len(out))
+        out += "{} 0 obj\n{}\nendobj\n".format(num, obj).encode("latin-1")
+    xref = len(out)
+    out += "xref\n0 {}\n0000000000 65535 f \n".format(len(objects) + 1).encode("latin-1")
+    out += b"".join("{:010d} 00000 n \n".format(o).encode("latin-1") for o in offsets)
+    out += "trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n".format(
+           len(objects) + 1, xref).encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+def dollars(cents):
+    return "${:,.2f}".format(cents/100)
+
+def odd_spacing(rng, word, rate):
+    # sometimes split a word in two, anywhere, like PyPDF2 does with real
+    # statements
+    if rng.random() >= rate or len(word) < 2:
+        return word
+    split = rng.randint(1, len(word) - 1)
+    return word[:split] + " " + word[split:]
+
+def make_tickers(rng, count):
+    tickers = set()
+    while len(tickers) < count:
+        tickers.add("".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+                            for _ in range(rng.randint(2, 4))))
+    return sorted(tickers)
+
+def statement_lines(rng, start, end, tickers, num_activity, odd_rate):
+    day = lambda: (start + datetime.timedelta(days = rng.randint(0, (end-start).days))
+                   ).strftime('%Y-%m-%d')
+    money = lambda cents: odd_spacing(rng, dollars(cents), odd_rate)
+
+    # holdings, values in cents
+    equities = []
+    for ticker in tickers:
+        quantity = rng.randint(1, 5000)
+        price = rng.randint(500, 50000)
+        value = quantity*price
+        equities.append((ticker, quantity, price, value, value*rng.randint(70, 130)//100))
+    cash = rng.randint(0, 500000)
+
+    # activity rows: (type, charged, credit)
+    activity = []
+    for _ in range(num_activity):
+        kind = rng.choice(["CONT", "DIV", "NRT", "BUY", "BUY", "SELL"])
+        amount = rng.randint(100, 200000)
+        activity.append((kind, amount if kind in ["NRT", "BUY"] else 0,
+                         0 if kind in ["NRT", "BUY"] else amount))
+    deposits = sum(credit for kind, _, credit in activity if kind == "CONT")
+    dividends = sum(credit for kind, _, credit in activity if kind == "DIV")
+    taxes = sum(charge for kind, charge, _ in activity if kind == "NRT")
+
+    start_s, end_s = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+    lines = ["Wealthsimple Trade Self-directed TFSA",
+             "Statement Period Owner {} {} - {}".format(
+             OWNER, odd_spacing(rng, start_s, odd_rate), odd_spacing(rng, end_s, odd_rate)),
+             "Account Number WS{}".format(rng.randint(10**6, 10**7)),
+             "Portfolio Cash",
+             "Cash {}".format(dollars(cash)),
+             "Total Portfolio {}".format(dollars(cash + sum(e[3] for e in equities))),
+             "Cash Paid In",
+             "Deposits {}".format(dollars(deposits)),
+             "Dividends {}".format(dollars(dividends)),
+             "Cash Paid Out",
+             "Fees $0.00",
+             "Taxes {}".format(dollars(taxes)),
+             "Withdrawals $0.00",
+             "Portfolio Equities",
+             "Symbol Total Quantity Segregated Quantity Market Price Currency "
+             "Market Value Book Cost"]
+    for num, (ticker, quantity, price, value, book) in enumerate(equities):
+        lines.append("Synthetic fund {} ({}) {}.0000 0.0000 {} CAD {} {}".format(
+                     num, ticker, quantity, money(price), money(value), money(book)))
+    lines += ["Activity - Current period",
+              "Date Transaction Description Charged Credit Balance"]
+    balance = cash
+    for kind, charge, credit in activity:
+        balance += credit - charge
+        lines.append("{} {} Synthetic {} of fund {} {} {}".format(
+                     odd_spacing(rng, day(), odd_rate), kind, kind.lower(),
+                     money(charge), money(credit), dollars(abs(balance))))
+    lines += ["Transactions for Future Settlement",
+              "Date Transaction Description Charged Credit Balance",
+              "{} BUY Synthetic buy of fund $100.00 $0.00 $0.00".format(end_s),
+              "LEVERAGE DISCLOSURE"]
+    return lines
+
+def paginate(lines, pages):
+    # pad with disclosure text up to 'pages' pages, every page ends with a footer
+    # so its last word is not joined to the first word of the next page
+    per_page = LINES_PER_PAGE - 1
+    while len(lines) < pages*per_page:
+        lines.append("This disclosure is synthetic filler text and has no meaning.")
+    chunks = [lines[i:i+per_page] for i in range(0, len(lines), per_page)]
+    return [chunk + ["Page {} of {}".format(num + 1, len(chunks))]
+            for num, chunk in enumerate(chunks)]
+
+def make_statement(path, start, end, holdings = 10, activity = 20, pages = 3,
+                   odd_rate = 0.2, seed = 0, tickers = None):
+    # returns the tickers held, for filling in info.csv
+    rng = random.Random(seed)
+    if tickers is None:
+        tickers = make_tickers(rng, holdings)
+    write_pdf(path, paginate(statement_lines(rng, start, end, tickers, activity,
+                                             odd_rate), pages))
+    return tickers
+
+def make_statements(out_dir, count, holdings = 10, activity = 20, pages = 3,
+                    odd_rate = 0.2, seed = 0):
+    # 'count' consecutive monthly statements holding the same tickers
+    os.makedirs(out_dir, exist_ok = True)
+    tickers = make_tickers(random.Random(seed), holdings)
+    paths = []
+    start = datetime.date(2020, 1, 1)
+    for num in range(count):
+        end = (start.replace(day = 28) + datetime.timedelta(days = 4)).replace(day = 1)
+        path = os.path.join(out_dir, "synthetic_{}.pdf".format(start.strftime('%Y-%m')))
+        make_statement(path, start, end - datetime.timedelta(days = 1), holdings,
+                       activity, pages, odd_rate, seed + num + 1, tickers)
+        paths.append(path)
+        start = end
+    return paths, tickers
+
+if __name__ == "__main__":
+    # python build/synthetic_statement.py {out dir} {# statements} [# holdings]
+    #                                     [# activity rows] [# pages]
+    args = [int(arg) for arg in sys.argv[2:]]
+    paths, tickers = make_statements(sys.argv[1], *args)
+    print("Wrote {} statements to {} (owner: '{}', {} words)".format(
+          len(paths), sys.argv[1], OWNER, len(OWNER.split())))
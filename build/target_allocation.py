@@ -0,0 +1,42 @@
+import os
+import csv
+
+
+# The target allocation (data/target_allocation.csv), shared by the summary
+# snapshot (summary_snapshot.py, make_summary.py) and the drift over every
+# statement (holdings_index.py). Plain csv so the summary needs no pandas.
+
+# attribute (region, type or sector), category, target (%)
+TARGET_FILE = "data/target_allocation.csv"
+# attributes of a holding (info.csv) an allocation can be given for
+ATTRIBUTES = ["region", "type", "sector"]
+
+
+def read_target(path = TARGET_FILE):
+    # {attribute: {category: target %}}, empty when there is no target file
+    if not os.path.exists(path):
+        return {}
+    target = {}
+    with open(path, newline = "") as f:
+        for row in csv.DictReader(f):
+            target.setdefault(row["attribute"], {})[row["category"]] = float(row["target"])
+    # the targets of an attribute may add up to less than 100%, e.g. region
+    # targets for the equities next to a type target for bonds
+    for attribute, goals in target.items():
+        if sum(goals.values()) > 100.01:
+            print("Warning. The {} targets in {} add up to {:.2f}%, more than 100%"
+                  .format(attribute, path, sum(goals.values())))
+    return target
+
+def is_complete(goals):
+    # targets adding up to 100%: anything else held is drift (a target of 0),
+    # otherwise the categories without a target are left out
+    return abs(sum(goals.values()) - 100) <= 0.01
+
+def categories(goals, held):
+    # categories to report, in order: the targets, then (for complete targets)
+    # every other category in 'held'
+    names = list(goals)
+    if is_complete(goals):
+        names += sorted(name for name in held if name not in goals)
+    return names
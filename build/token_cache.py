@@ -0,0 +1,269 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import numpy as np
+from PyPDF2 import PdfReader
+
+
+# bump whenever the extraction/tokenization changes, old entries are then
+# simply never hit again and age out of the cache
+PARSER_VERSION = 2
+CACHE_DIR = "cache/tokens"
+# cache is trimmed (least recently used first) to this size after every store
+MAX_CACHE_BYTES = 64*1024*1024
+
+# entry layout (little endian):
+#   header     : magic, parser version, number of tokens, number of pages,
+#                complete (0 when extraction stopped early, see scan_tokens)
+#   offsets    : uint32[n_tokens + 1], byte offset of each token in the blob
+#   page_starts: uint32[n_pages], index of the first token of each page
+#   blob       : utf-8 encoded tokens, back to back
+MAGIC = b"WSTK"
+HEADER = struct.Struct("<4sIIII")
+# the PDF is hashed this many bytes at a time
+CHUNK_SIZE = 1024*1024
+
+
+def stream_pages(pdf_name):
+    # text of one page at a time, a page is only decoded when asked for. the
+    # reader is given the open file (a path would be read into memory whole)
+    # so only the objects of the pages read are loaded
+    with open(pdf_name, "rb") as f:
+        reader = PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text()
+
+def stream_tokens(pages):
+    # yields (page start, tokens) for each page, such that the tokens put back
+    # to back are "".join(pages).split(), i.e. the last word of a page and the
+    # first word of the next page are joined when there is no whitespace
+    # between them. the last word of a page is therefore held back until the
+    # next page, and yielded last with a page start of None. 'page start' is
+    # the index of the first token of the page
+    emitted = 0
+    held = None
+    for page in pages:
+        page_tokens = page.split()
+        ready = []
+        if held is not None:
+            if len(page_tokens) != 0 and not page[0].isspace():
+                page_tokens[0] = held + page_tokens[0]
+                held = None
+            elif len(page) != 0:
+                ready.append(held)
+                held = None
+        start = emitted + len(ready) + (0 if held is None else 1)
+        if len(page_tokens) != 0 and not page[-1].isspace():
+            held = page_tokens.pop()
+        ready += page_tokens
+        emitted += len(ready)
+        yield start, ready
+    if held is not None:
+        yield None, [held]
+
+def tokenize_pages(pages):
+    # the whole token list and where each page starts
+    tokens = []
+    page_starts = []
+    for start, page_tokens in stream_tokens(pages):
+        if start is not None:
+            page_starts.append(start)
+        tokens += page_tokens
+    return tokens, page_starts
+
+def extract_tokens(pdf_name):
+    tokens, page_starts = tokenize_pages(stream_pages(pdf_name))
+    return tokens, page_starts, True
+
+def scan_tokens(pdf_name, scanner):
+    # feeds each page to 'scanner' as soon as it is tokenized, and stops
+    # extracting pages once scanner.closed(). returns the tokens read and
+    # whether that is the whole statement
+    tokens = []
+    page_starts = []
+    for start, page_tokens in stream_tokens(stream_pages(pdf_name)):
+        if start is not None:
+            page_starts.append(start)
+        tokens += page_tokens
+        scanner.feed(page_tokens)
+        if scanner.closed():
+            return tokens, page_starts, False
+    return tokens, page_starts, True
+
+def cache_key(pdf_name):
+    sha = hashlib.sha256()
+    with open(pdf_name, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return "{}-v{}".format(sha.hexdigest(), PARSER_VERSION)
+
+def entry_path(key):
+    return os.path.join(CACHE_DIR, key + ".tok")
+
+def write_entry(path, tokens, page_starts, complete):
+    encoded = [token.encode("utf-8") for token in tokens]
+    offsets = np.zeros(len(encoded) + 1, dtype = "<u4")
+    np.cumsum([len(token) for token in encoded], out = offsets[1:])
+    # write to a temporary file first so a half-written entry is never read
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, PARSER_VERSION, len(tokens), len(page_starts),
+                            int(complete)))
+        f.write(offsets.tobytes())
+        f.write(np.asarray(page_starts, dtype = "<u4").tobytes())
+        f.write(b"".join(encoded))
+    os.replace(tmp_path, path)
+
+def read_entry(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            magic, version, n_tokens, n_pages, complete = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != PARSER_VERSION:
+                return None
+            offsets = np.frombuffer(mm, dtype = "<u4", count = n_tokens + 1,
+                                    offset = HEADER.size)
+            pos = HEADER.size + offsets.nbytes
+            page_starts = np.frombuffer(mm, dtype = "<u4", count = n_pages,
+                                        offset = pos).tolist()
+            pos += 4*n_pages
+            blob = mm[pos:pos + int(offsets[-1])]
+            bounds = offsets.tolist()
+            # drop the numpy views before the map is closed
+            del offsets
+    tokens = [blob[bounds[j]:bounds[j+1]].decode("utf-8") for j in range(n_tokens)]
+    return tokens, page_starts, bool(complete)
+
+def scan_entry(entry, scanner):
+    # same as scan_tokens, for a cached entry
+    tokens, page_starts, _ = entry
+    ends = page_starts[1:] + [len(tokens)]
+    start = 0
+    for end in ends:
+        scanner.feed(tokens[start:end])
+        start = end
+        if scanner.closed():
+            return
+
+def load_tokens(pdf_name, scanner = None):
+    # returns the token list scanned by read_pdf.main and the index of the first
+    # token of each page, decoding the PDF only on a cache miss. with a
+    # 'scanner' (section_index.SectionScanner) the tokens are also fed to it,
+    # and on a miss no page is extracted after the scanner has closed, so only
+    # the pages read are cached. such a partial entry is not used without a
+    # scanner, the whole statement is then extracted again
+    path = entry_path(cache_key(pdf_name))
+    if os.path.exists(path):
+        entry = read_entry(path)
+        if entry is not None and (scanner is not None or entry[2]):
+            if scanner is not None:
+                scan_entry(entry, scanner)
+            # a partial entry ends where the scanner closed when it was
+            # written. if it does not close now (the anchors changed since),
+            # the statement is extracted again
+            if entry[2] or scanner.closed():
+                # mark as recently used
+                os.utime(path)
+                return entry[:2]
+            scanner.reset()
+    if scanner is None:
+        tokens, page_starts, complete = extract_tokens(pdf_name)
+    else:
+        tokens, page_starts, complete = scan_tokens(pdf_name, scanner)
+    os.makedirs(CACHE_DIR, exist_ok = True)
+    write_entry(path, tokens, page_starts, complete)
+    evict(MAX_CACHE_BYTES)
+    return tokens, page_starts
+
+def list_entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for f in os.listdir(CACHE_DIR):
+        if not f.endswith(".tok"):
+            continue
+        path = os.path.join(CACHE_DIR, f)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # evicted by another process (e.g. a batch_read.py worker)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    # least recently used first
+    return sorted(entries)
+
+def evict(max_bytes):
+    entries = list_entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+def find_pdfs(paths):
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs += sorted(os.path.join(path, f) for f in os.listdir(path)
+                           if f.lower().endswith(".pdf"))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+def warm(paths):
+    for pdf_name in find_pdfs(paths):
+        tokens, page_starts = load_tokens(pdf_name)
+        print("{}: {} tokens, {} pages".format(pdf_name, len(tokens), len(page_starts)))
+
+def inspect(paths):
+    if len(paths) == 0:
+        entries = list_entries()
+        for mtime, size, path in entries:
+            with open(path, "rb") as f:
+                _, version, n_tokens, n_pages, complete = HEADER.unpack(
+                    f.read(HEADER.size))
+            if version != PARSER_VERSION:
+                state = "old version"
+            else:
+                state = "{:>7} tokens  {:>3} pages{}".format(
+                        n_tokens, n_pages, "" if complete else " (partial)")
+            print("{}  {:>9} bytes  {}  last used {}".format(
+                  os.path.basename(path), size, state,
+                  time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))))
+        print("{} entries, {} of {} bytes used".format(
+              len(entries), sum(size for _, size, _ in entries), MAX_CACHE_BYTES))
+        return
+    for pdf_name in find_pdfs(paths):
+        path = entry_path(cache_key(pdf_name))
+        if not os.path.exists(path):
+            print("{}: not cached".format(pdf_name))
+            continue
+        tokens, page_starts, complete = read_entry(path)
+        print("{}: {} ({} tokens{})".format(pdf_name, os.path.basename(path), len(tokens),
+              "" if complete else ", partial: read up to the end of the activity"))
+        for page, start in enumerate(page_starts):
+            print("  page {}: starts at token {} ({})".format(page, start,
+                  " ".join(tokens[start:start+5])))
+
+if __name__ == "__main__":
+    # python build/token_cache.py warm {statement dirs or PDFs}
+    # python build/token_cache.py inspect [statement dirs or PDFs]
+    # python build/token_cache.py evict [max bytes, default 0 i.e. everything]
+    if sys.argv[1] == "warm":
+        warm(sys.argv[2:])
+    elif sys.argv[1] == "inspect":
+        inspect(sys.argv[2:])
+    elif sys.argv[1] == "evict":
+        max_bytes = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+        print("Evicted {} entries".format(evict(max_bytes)))
+    else:
+        print("Unknown command: {}. Expected warm, inspect or evict".format(sys.argv[1]))